@@ -10,18 +10,32 @@ from panda3d.core import (
     DirectionalLight, AmbientLight, WindowProperties,
     GeomVertexFormat, GeomVertexData, Geom, GeomNode,
     GeomTriangles, GeomVertexWriter, TransparencyAttrib,
-    NodePath, Vec3, Point3, TextNode, Texture, CardMaker,
-    LColor, TextureStage, ClockObject, AudioSound
+    NodePath, Vec3, TextNode, Texture, CardMaker,
+    LColor, TextureStage, ClockObject, AudioSound, PNMImage, Filename
 )
 
 from noise import pnoise2
+import numpy as np
 import math
 import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from multiprocessing import shared_memory
+import threading
 from queue import Queue
 import logging
 import functools
+import heapq
+import itertools
+import mmap
+import shutil
+import tempfile
+from collections import OrderedDict, deque
 import os
 import struct
+import sys
+import time
+import zlib
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -36,16 +50,53 @@ LACUNARITY  = 2.0     # Standard “doubling” frequency
 
 CHUNK_SIZE = 8
 RENDER_DISTANCE = 4
+ADAPTIVE_RENDER_DISTANCE = True  # grow/shrink the render distance to hold ADAPTIVE_TARGET_FPS
+RENDER_DISTANCE_MIN = 2          # adaptive range
+RENDER_DISTANCE_MAX = 12
+ADAPTIVE_TARGET_FPS = 60
+ADAPTIVE_WINDOW = 2.0            # seconds of frames judged per decision, fresh after each change
+ADAPTIVE_GROW_MARGIN = 0.05      # grow while the average frame is within 5% of the target...
+ADAPTIVE_SHRINK_MARGIN = 0.25    # ...shrink once it is 25% over
+ADAPTIVE_BACKLOG_LIMIT = 64      # or once this much chunk work stayed queued, not draining, for a window
+ADAPTIVE_RETRY_DELAY = 30.0      # seconds before growing back into a distance that was too slow
 WORLD_HEIGHT = 32  # Maximum world height (for chunking)
-MAX_FINALIZE_PER_FRAME = 1
-MAX_DIRTY_PER_FRAME = 6
+COLUMN_SECTIONS = WORLD_HEIGHT // CHUNK_SIZE  # vertical chunks per column
+AIR = 0  # reserved block id for empty cells in dense arrays
+PALETTE_STORAGE = True  # keep unedited chunks as a block palette plus bit-packed indices
+UNPACK_CACHE_CHUNKS = 64  # decoded arrays of recently read packed chunks kept for the mesher/physics
+FRAME_TARGET_MS = 1000 / 60  # frame time the per-frame chunk work is budgeted against
+FRAME_WORK_BUDGET_MS = 4.0    # most milliseconds of chunk work per frame
+FRAME_WORK_MIN_MS = 0.5       # least, even when the rest of the frame already overran the target
+LOAD_VIEW_WEIGHT = 1.5  # chunks of distance a column in view gains over one behind the player
+LOAD_REPRIORITIZE_ANGLE = 45  # degrees the camera must turn before the load queue is re-sorted
+MESH_MODE = "greedy"  # "greedy" merges coplanar same-type faces, "naive" = one quad per face
+MESH_WORKERS = 2      # threads running the worker-side meshing stage
+TEXTURE_ATLAS = False  # one atlas-textured Geom per chunk instead of one per block type
+ATLAS_TILE_SIZE = 64   # pixels per block texture in the generated atlas
+ATLAS_MESH = 0         # mesh_buffers key for the single atlas-textured buffer
+REGION_BATCHING = True      # flatten chunk meshes into per-region batches
+REGION_SIZE = 4             # chunk columns per region side
+REGION_REBATCH_DELAY = 1.0  # seconds a region must stay unchanged before re-batching
+CHUNK_GEN_BACKEND = "process"  # "process" (all cores) or "thread"
+CHUNK_GEN_WORKERS = None       # None = one worker per CPU core
+CHUNK_GEN_MAX_RESTARTS = 3     # process pools rebuilt after a worker dies before falling back to threads
+WORLD_DIR = "world"         # region files holding the saved edits
+REGION_FILE_CHUNKS = 8      # chunks per region file side (8³ chunk slots per file)
+LEGACY_WORLD_FILE = "world.dat"  # flat <iiiB edit records from older versions
+JOURNAL_SYNC_INTERVAL = 2.0        # seconds between batched fsyncs of the edit journal
+JOURNAL_COMPACT_BYTES = 1 << 20    # fold the journal into the region files past this size...
+JOURNAL_COMPACT_INTERVAL = 60.0    # ...or this many seconds after the last compaction
+CHUNK_CACHE_BYTES = 64 << 20        # evicted chunks (blocks + meshes) kept in memory
+CHUNK_CACHE_DISK_BYTES = 256 << 20  # colder evicted chunks spilled to a temp directory
+LOD_DISTANCE = 4  # columns farther than this (in chunks) render as coarse LOD meshes
+LOD_CELL = 2      # blocks per LOD cell side; must divide CHUNK_SIZE
 BLOCK_TYPES = {
     1: {'name': 'dirt',  'texture': 'assets/dirt.jpg'},
     2: {'name': 'grass', 'texture': 'assets/grass.jpg'},
     3: {'name': 'stone', 'texture': 'assets/stone.png'},
     4: {'name': 'sand',  'texture': 'assets/sand.png'},
     5: {'name': 'snow',  'texture': 'assets/snow.png'},
-    6: {'name': 'cactus',  'texture': 'assets/cactus.png'},
+    6: {'name': 'cactus',  'texture': 'assets/cactus.png', 'top_texture': 'assets/cactus-top.png'},
     7: {'name': 'glass',  'texture': 'assets/glass.png'},
     8: {'name': 'oak_plank', 'texture': 'assets/oak_plank.png'},
     9: {'name': 'oak',    'texture': 'assets/oak.png'},
@@ -56,8 +107,11 @@ BLOCK_TYPES = {
 
 PLAYER_HEIGHT = 1.75
 PLAYER_RADIUS = 0.4
+PLAYER_EYE_HEIGHT = 1.6  # camera height above the feet (bottom of the collision box)
 GRAVITY = 18
 JUMP_VELOCITY = 7.0
+PHYSICS_STEP = 1 / 60    # fixed simulation timestep, in seconds
+MAX_PHYSICS_STEPS = 8    # per frame; after a longer stall the leftover time is dropped
 
 HOTBAR_SLOT_COUNT = 9
 HOTBAR_SLOT_SIZE = 0.12
@@ -74,6 +128,14 @@ FACES = [
 ]
 FACE_UVS = [[(0, 0), (1, 0), (1, 1), (0, 1)] for _ in range(6)]
 
+def _face_uv_axes(verts):
+    # u runs along the edge v0->v1 and v along v1->v2
+    u_axis = next(i for i in range(3) if verts[0][i] != verts[1][i])
+    v_axis = next(i for i in range(3) if verts[1][i] != verts[2][i])
+    return u_axis, v_axis
+
+FACE_UV_AXES = [_face_uv_axes(verts) for _, _, verts in FACES]
+
 def world_to_chunk_block(pos):
     cx = int(math.floor(pos[0] / CHUNK_SIZE))
     cy = int(math.floor(pos[1] / CHUNK_SIZE))
@@ -98,65 +160,1575 @@ def get_terrain_height(x, y,
     max_h = WORLD_HEIGHT - 1
     return int(normalized * max_h)
 
+def _surface_block(height):
+    if height >= 20: return 5  # snow
+    if height >= 15: return 3  # stone
+    if height >= 6:  return 2  # grass
+    return 4                   # sand
+
+def _fill_block(height):
+    if height >= 15: return 3  # stone
+    if height >= 6:  return 1  # dirt
+    return 4                   # more sand
+
+# per-height lookup tables so a whole column can be filled in one numpy pass
+SURFACE_BLOCK_LUT = np.array([_surface_block(h) for h in range(WORLD_HEIGHT)], dtype=np.uint8)
+FILL_BLOCK_LUT    = np.array([_fill_block(h) for h in range(WORLD_HEIGHT)], dtype=np.uint8)
+
+def terrain_heightmap(chunk_x, chunk_y, margin=0):
+    """Int array of terrain heights for one chunk column, widened by `margin` blocks on every side."""
+    # pnoise2 is a C call per sample; at 8x8 samples it beats a numpy Perlin port,
+    # so the saving here is doing it once per column instead of once per plane.
+    base_x = chunk_x * CHUNK_SIZE - margin
+    base_y = chunk_y * CHUNK_SIZE - margin
+    size = CHUNK_SIZE + 2 * margin
+    heights = np.empty((size, size), dtype=np.int32)
+    for x in range(size):
+        for y in range(size):
+            heights[x, y] = get_terrain_height(base_x + x, base_y + y,
+                                               SCALE, OCTAVES, PERSISTENCE, LACUNARITY)
+    return heights
+
+def generate_column_blocks(chunk_x, chunk_y, heights=None):
+    """Every section of a chunk column as one uint8 [cz, x, y, z] array (AIR = empty), vectorized."""
+    if heights is None:
+        heights = terrain_heightmap(chunk_x, chunk_y)
+    h = np.clip(heights, 0, WORLD_HEIGHT - 1)[:, :, None]
+    wz = np.arange(COLUMN_SECTIONS * CHUNK_SIZE, dtype=np.int32)[None, None, :]
+    # same snow/stone/grass/sand rules as Chunk.generate_blocks_data
+    column = np.where(wz < 2, np.uint8(3), FILL_BLOCK_LUT[h])
+    column = np.where(wz == h, SURFACE_BLOCK_LUT[h], column)
+    column = np.where(wz > heights[:, :, None], np.uint8(AIR), column).astype(np.uint8)
+    # (x, y, cz*8+z) -> (cz, x, y, z)
+    column = column.reshape(CHUNK_SIZE, CHUNK_SIZE, COLUMN_SECTIONS, CHUNK_SIZE)
+    return np.ascontiguousarray(column.transpose(2, 0, 1, 3))
+
+def benchmark_terrain(columns=64):
+    """Compare per-chunk scalar generation against the column generator (seconds)."""
+    keys = [(x, y) for x in range(-columns // 8, columns // 8) for y in range(4)][:columns]
+    t0 = time.perf_counter()
+    for cx, cy in keys:
+        for cz in range(COLUMN_SECTIONS):
+            Chunk.generate_blocks_data(cx, cy, cz)
+    scalar = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for cx, cy in keys:
+        generate_column_blocks(cx, cy)
+    vectorized = time.perf_counter() - t0
+    log.info("terrain: %d columns scalar %.3fs, column generator %.3fs (x%.1f)",
+             len(keys), scalar, vectorized, scalar / max(vectorized, 1e-9))
+    return scalar, vectorized
+
+COLUMN_SHAPE = (COLUMN_SECTIONS, CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+COLUMN_BYTES = COLUMN_SECTIONS * CHUNK_SIZE ** 3
+
+# worker-side cache of attached shared memory blocks (name -> SharedMemory)
+_worker_shm = {}
+
+def _attach_shared_memory(name):
+    shm = _worker_shm.get(name)
+    if shm is None:
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # older versions always register with the resource tracker; spawn
+            # workers share the parent's tracker, so this just re-registers the
+            # parent's own block, which ColumnGenerator.shutdown() unlinks
+            shm = shared_memory.SharedMemory(name=name)
+        _worker_shm[name] = shm
+    return shm
+
+def _generate_column_worker(chunk_x, chunk_y, shm_name, slot):
+    """Process-pool entry point: write the column into a shared slot, or return raw bytes."""
+    column = generate_column_blocks(chunk_x, chunk_y)
+    if shm_name is None:
+        return column.tobytes()
+    shm = _attach_shared_memory(shm_name)
+    offset = slot * COLUMN_BYTES
+    shm.buf[offset:offset + COLUMN_BYTES] = column.tobytes()
+    return None
+
+class ColumnGenerator:
+    """Runs generate_column_blocks on a thread pool or a process pool."""
+    def __init__(self, backend=None, workers=None):
+        backend = backend or CHUNK_GEN_BACKEND
+        self.backend = backend
+        self.workers = workers or CHUNK_GEN_WORKERS or os.cpu_count() or 2
+        self.shm = None
+        self.free_slots = []
+        self.slot_lock = threading.Lock()
+        self.restarts = 0  # process pools rebuilt after a worker died
+        if backend == "process":
+            self.executor = self._process_pool()
+            # workers write columns into fixed-size shared memory slots; a job
+            # that finds every slot busy returns its column as bytes instead
+            slots = self.workers * 4
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * COLUMN_BYTES)
+            self.free_slots = list(range(slots))
+        elif backend == "thread":
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            raise ValueError(f"unknown chunk generation backend {backend!r}")
+        log.info("Chunk generation: %s backend, %d workers", backend, self.workers)
+
+    def _process_pool(self):
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def submit(self, chunk_x, chunk_y, callback):
+        """Generate a column; callback(column) runs on completion, with None on failure."""
+        if self.shm is None:
+            future = self.executor.submit(generate_column_blocks, chunk_x, chunk_y)
+            future.add_done_callback(lambda f: callback(self._result(f)))
+            return future
+        with self.slot_lock:
+            slot = self.free_slots.pop() if self.free_slots else None
+        shm_name = self.shm.name if slot is not None else None
+        try:
+            future = self.executor.submit(_generate_column_worker, chunk_x, chunk_y, shm_name, slot)
+        except BrokenProcessPool:
+            # a worker died (OOM kill, crash); the column is retried by whoever asked for it
+            if slot is not None:
+                with self.slot_lock:
+                    self.free_slots.append(slot)
+            self._replace_broken_pool()
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            callback(None)
+            return future
+        future.add_done_callback(lambda f: callback(self._read_result(f, slot)))
+        return future
+
+    def _replace_broken_pool(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.restarts += 1
+        if self.restarts <= CHUNK_GEN_MAX_RESTARTS:
+            log.error("Chunk generation worker died; restarting the process pool")
+            self.executor = self._process_pool()
+            return
+        log.error("Chunk generation workers keep dying; falling back to the thread backend")
+        self.backend = "thread"
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        shm, self.shm = self.shm, None  # in-flight slot reads see None and report a failure
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            pass  # a read still holds a view; the mapping goes when it is collected
+
+    def _result(self, future):
+        if future.cancelled():
+            return None
+        if future.exception() is not None:
+            log.error("Column generation failed: %r", future.exception())
+            return None
+        return future.result()
+
+    def _read_result(self, future, slot):
+        try:
+            raw = self._result(future)
+            if slot is None:
+                return None if raw is None else np.frombuffer(raw, dtype=np.uint8).reshape(COLUMN_SHAPE)
+            if future.cancelled() or future.exception() is not None or self.shm is None:
+                return None
+            offset = slot * COLUMN_BYTES
+            return np.frombuffer(self.shm.buf, dtype=np.uint8, count=COLUMN_BYTES,
+                                 offset=offset).reshape(COLUMN_SHAPE).copy()
+        finally:
+            if slot is not None:
+                with self.slot_lock:
+                    self.free_slots.append(slot)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.shm is not None:
+            shm, self.shm = self.shm, None
+            shm.close()
+            shm.unlink()
+
+class ChunkLoadScheduler:
+    """Feeds column jobs to a ColumnGenerator, nearest and most in-view first."""
+    def __init__(self, generator, max_in_flight=None):
+        self.generator = generator
+        self.max_in_flight = max_in_flight or generator.workers * 2
+        self.heap = []        # (priority, seq, (cx, cy)), rebuilt when the player moves or turns
+        self.queued = {}      # (cx, cy) -> callback, not handed to the generator yet
+        self.running = {}     # (cx, cy) -> future (None while being submitted)
+        self.stale = set()    # running columns that are no longer wanted
+        self.lock = threading.Lock()
+        self.seq = itertools.count()
+        self.player_col = (0, 0)
+        self.forward = (0.0, 1.0)
+        self.cancelled = 0    # jobs dropped before they started
+        self.wasted = 0       # jobs that ran to completion for an unwanted column
+
+    def _priority(self, col):
+        dx, dy = col[0] - self.player_col[0], col[1] - self.player_col[1]
+        dist = math.hypot(dx, dy)
+        if not dist:
+            return 0.0
+        # columns in front of the camera win over equally distant ones behind it
+        facing = (dx * self.forward[0] + dy * self.forward[1]) / dist
+        return dist - LOAD_VIEW_WEIGHT * facing
+
+    def has(self, col):
+        return col in self.queued or col in self.running
+
+    def request(self, col, callback):
+        """Queue a column; callback(column) runs when it is generated, with None on failure or cancel."""
+        with self.lock:
+            if col in self.running:
+                self.stale.discard(col)  # wanted again before the old job finished
+                return
+            if col in self.queued:
+                return
+            self.queued[col] = callback
+        heapq.heappush(self.heap, (self._priority(col), next(self.seq), col))
+
+    def cancel(self, col):
+        # queued jobs are dropped; running ones are cancelled if they have not
+        # started, and otherwise counted as wasted when they finish
+        callback = self.queued.pop(col, None)
+        if callback is not None:
+            self.cancelled += 1
+            callback(None)
+            return
+        with self.lock:
+            future = self.running.get(col)
+            if col not in self.running:
+                return
+            self.stale.add(col)
+        if future is not None and future.cancel():
+            self.cancelled += 1  # its done-callback has already reported None
+
+    def reprioritize(self, player_col, forward):
+        self.player_col = player_col
+        self.forward = forward
+        self.heap = [(self._priority(col), next(self.seq), col) for col in self.queued]
+        heapq.heapify(self.heap)
+
+    def pump(self):
+        """Hand queued columns to the generator until max_in_flight are running."""
+        while self.heap and len(self.running) < self.max_in_flight:
+            _, _, col = heapq.heappop(self.heap)
+            callback = self.queued.pop(col, None)
+            if callback is None:
+                continue  # cancelled, or a duplicate heap entry
+            with self.lock:
+                self.running[col] = None
+            future = self.generator.submit(
+                col[0], col[1], functools.partial(self._done, col, callback))
+            with self.lock:
+                if col in self.running:
+                    self.running[col] = future
+
+    def _done(self, col, callback, column):
+        # runs on a generator thread
+        with self.lock:
+            future = self.running.pop(col, None)
+            if col in self.stale:
+                self.stale.discard(col)
+                if column is not None and not (future is not None and future.cancelled()):
+                    self.wasted += 1
+        callback(column)
+
+    def stats(self):
+        """Return (queued, in flight, cancelled, wasted)."""
+        return len(self.queued), len(self.running), self.cancelled, self.wasted
+
+def exposed_face_types(types, solid):
+    """Per FACES entry, the block types where that face is exposed; `solid` is Chunk.padded_solid()."""
+    n = CHUNK_SIZE
+    faces = []
+    for (nx, ny, nz), _, _ in FACES:
+        neighbour = solid[1 + nx:1 + nx + n, 1 + ny:1 + ny + n, 1 + nz:1 + nz + n]
+        faces.append(np.where(neighbour, np.uint8(AIR), types))
+    return faces
+
+def greedy_rectangles(plane):
+    """Merge equal non-zero cells of a 2D list into (i, j, width, height, value) rectangles."""
+    size_i = len(plane)
+    size_j = len(plane[0])
+    done = [[False] * size_j for _ in range(size_i)]
+    rects = []
+    for j in range(size_j):
+        for i in range(size_i):
+            value = plane[i][j]
+            if value == AIR or done[i][j]:
+                continue
+            w = 1
+            while i + w < size_i and plane[i + w][j] == value and not done[i + w][j]:
+                w += 1
+            h = 1
+            while j + h < size_j and all(plane[i + k][j + h] == value and not done[i + k][j + h]
+                                         for k in range(w)):
+                h += 1
+            for dj in range(h):
+                for di in range(w):
+                    done[i + di][j + dj] = True
+            rects.append((i, j, w, h, value))
+    return rects
+
+def chunk_quads(types, solid, greedy):
+    """Return (face_idx, origin, ext, block_type, exposed face count) arrays for a chunk's quads."""
+    face_parts, origin_parts, ext_parts, type_parts = [], [], [], []
+    face_count = 0
+    for face_idx, face_types in enumerate(exposed_face_types(types, solid)):
+        cells = np.argwhere(face_types)
+        face_count += len(cells)
+        if not len(cells):
+            continue
+        if not greedy:
+            origins = cells
+            exts = np.ones_like(cells)
+            block_types = face_types[cells[:, 0], cells[:, 1], cells[:, 2]]
+        else:
+            normal_axis = [abs(c) for c in FACES[face_idx][0]].index(1)
+            u_axis, v_axis = [a for a in range(3) if a != normal_axis]
+            rects = []
+            for layer in np.unique(cells[:, normal_axis]).tolist():
+                plane = np.take(face_types, layer, axis=normal_axis).tolist()
+                rects.extend((layer,) + r for r in greedy_rectangles(plane))
+            rects = np.array(rects, dtype=np.int64)
+            origins = np.zeros((len(rects), 3), dtype=np.int64)
+            exts = np.ones((len(rects), 3), dtype=np.int64)
+            origins[:, normal_axis] = rects[:, 0]
+            origins[:, u_axis], origins[:, v_axis] = rects[:, 1], rects[:, 2]
+            exts[:, u_axis], exts[:, v_axis] = rects[:, 3], rects[:, 4]
+            block_types = rects[:, 5]
+        face_parts.append(np.full(len(origins), face_idx, dtype=np.int64))
+        origin_parts.append(origins)
+        ext_parts.append(exts)
+        type_parts.append(block_types)
+    if not face_parts:
+        empty = np.zeros((0, 3), dtype=np.int64)
+        return np.zeros(0, dtype=np.int64), empty, empty, np.zeros(0, dtype=np.uint8), 0
+    return (np.concatenate(face_parts), np.concatenate(origin_parts),
+            np.concatenate(ext_parts), np.concatenate(type_parts).astype(np.uint8),
+            face_count)
+
+FACE_VERTS_ARRAY   = np.array([verts for _, _, verts in FACES], dtype=np.float32)   # (6, 4, 3)
+FACE_NORMALS_ARRAY = np.array([d for d, _, _ in FACES], dtype=np.float32)           # (6, 3)
+FACE_UVS_ARRAY     = np.array(FACE_UVS, dtype=np.float32)                           # (6, 4, 2)
+FACE_UV_AXES_ARRAY = np.array(FACE_UV_AXES, dtype=np.int64)                         # (6, 2)
+QUAD_TRIANGLES     = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)
+EMPTY_MESH = ({}, 0, 0)  # mesh_buffers result for a chunk with no exposed faces
+VERTEX_STRIDE      = 8  # floats per row of GeomVertexFormat.getV3n3t2(): xyz, normal, uv
+
+def quad_vertex_arrays(face_idx, origin, ext, offset):
+    """Expand quads into interleaved V3N3T2 float32 rows and uint32 triangle indices."""
+    count = len(face_idx)
+    ext = ext.astype(np.float32)
+    rows = np.empty((count, 4, VERTEX_STRIDE), dtype=np.float32)
+    rows[:, :, 0:3] = (origin + offset).astype(np.float32)[:, None, :] + \
+        FACE_VERTS_ARRAY[face_idx] * ext[:, None, :]
+    rows[:, :, 3:6] = FACE_NORMALS_ARRAY[face_idx][:, None, :]
+    # scale UVs by the quad size so merged faces tile the texture
+    uv_axes = FACE_UV_AXES_ARRAY[face_idx]
+    uv_scale = np.take_along_axis(ext, uv_axes, axis=1)
+    rows[:, :, 6:8] = FACE_UVS_ARRAY[face_idx] * uv_scale[:, None, :]
+    indices = (np.arange(count, dtype=np.uint32)[:, None] * 4 + QUAD_TRIANGLES).reshape(-1)
+    return rows.reshape(-1, VERTEX_STRIDE), indices
+
+def make_geom(name, rows, indices):
+    """Build a Geom by copying vertex rows and indices straight into Panda's buffers."""
+    vdata = GeomVertexData(name, GeomVertexFormat.getV3n3t2(), Geom.UHStatic)
+    vdata.uncleanSetNumRows(len(rows))
+    np.frombuffer(memoryview(vdata.modifyArray(0)).cast('B'), dtype=np.float32)[:] = rows.reshape(-1)
+    triangles = GeomTriangles(Geom.UHStatic)
+    triangles.setIndexType(Geom.NT_uint32)
+    index_array = triangles.modifyVertices()
+    index_array.uncleanSetNumRows(len(indices))
+    np.frombuffer(memoryview(index_array).cast('B'), dtype=np.uint32)[:] = indices
+    geom = Geom(vdata)
+    geom.addPrimitive(triangles)
+    return geom
+
+def build_texture_atlas():
+    """Pack every BLOCK_TYPES texture into one atlas: (PNMImage, uv_rects[block_type, face_idx])."""
+    paths = []
+    for info in BLOCK_TYPES.values():
+        for key in ('texture', 'top_texture'):
+            if key in info and info[key] not in paths:
+                paths.append(info[key])
+    cols = math.ceil(math.sqrt(len(paths)))
+    rows = math.ceil(len(paths) / cols)
+    tile = ATLAS_TILE_SIZE
+    atlas = PNMImage(cols * tile, rows * tile, 4)
+    atlas.fill(1, 0, 1)
+    atlas.alphaFill(1)
+    tile_rects = {}
+    for i, path in enumerate(paths):
+        col, row = i % cols, i // cols
+        src = PNMImage()
+        src.read(Filename(path))
+        if not src.hasAlpha():
+            src.addAlpha()
+            src.alphaFill(1)
+        scaled = PNMImage(tile, tile, 4)
+        scaled.alphaFill(1)
+        scaled.quickFilterFrom(src)
+        atlas.copySubImage(scaled, col * tile, row * tile)
+        # PNMImage rows run top-down, texture v runs bottom-up
+        inset = 0.5  # half a texel, so nearest filtering never samples the next tile
+        tile_rects[path] = ((col * tile + inset) / atlas.getXSize(),
+                            1 - ((row + 1) * tile - inset) / atlas.getYSize(),
+                            ((col + 1) * tile - inset) / atlas.getXSize(),
+                            1 - (row * tile + inset) / atlas.getYSize())
+    uv_rects = np.zeros((256, len(FACES), 4), dtype=np.float32)
+    for k, info in BLOCK_TYPES.items():
+        for face_idx, (_, face_name, _) in enumerate(FACES):
+            path = info['texture']
+            if face_name in ('top', 'bottom'):
+                path = info.get('top_texture', path)
+            uv_rects[k, face_idx] = tile_rects[path]
+    return atlas, uv_rects
+
+def mesh_buffers(types, solid, greedy, offset, atlas_uvs=None):
+    """Worker-side mesher, no Panda objects: ({block_type: (rows, indices)}, quads, exposed faces)."""
+    if atlas_uvs is not None:
+        # a merged quad cannot repeat a sub-rectangle of the atlas, so only
+        # one-block quads are emitted in atlas mode
+        greedy = False
+    face_idx, origin, ext, block_types, face_count = chunk_quads(types, solid, greedy)
+    buffers = {}
+    if atlas_uvs is not None:
+        if len(face_idx):
+            rows, indices = quad_vertex_arrays(face_idx, origin, ext, offset)
+            rects = np.repeat(atlas_uvs[block_types, face_idx], 4, axis=0)
+            rows[:, 6] = rects[:, 0] + rows[:, 6] * (rects[:, 2] - rects[:, 0])
+            rows[:, 7] = rects[:, 1] + rows[:, 7] * (rects[:, 3] - rects[:, 1])
+            buffers[ATLAS_MESH] = (rows, indices)
+        return buffers, len(face_idx), face_count
+    for k in np.unique(block_types).tolist():
+        sel = block_types == k
+        buffers[k] = quad_vertex_arrays(face_idx[sel], origin[sel], ext[sel], offset)
+    return buffers, len(face_idx), face_count
+
+def lod_column_buffers(chunk_x, chunk_y):
+    """Coarse mesh for a far chunk column from the heightmap: ({block_type: (rows, indices)}, quads)."""
+    ring = terrain_heightmap(chunk_x, chunk_y, margin=1)
+    n, c = CHUNK_SIZE // LOD_CELL, LOD_CELL
+    cells = ring[1:-1, 1:-1].reshape(n, c, n, c).max(axis=(1, 3))
+    # cell heights with a border of the lowest outside surface along each cell edge, so
+    # the border walls reach down to whatever the neighbour draws and leave no gap
+    padded = np.empty((n + 2, n + 2), dtype=np.int32)
+    padded[1:-1, 1:-1] = cells
+    padded[0, 1:-1] = ring[0, 1:-1].reshape(n, c).min(axis=1)
+    padded[-1, 1:-1] = ring[-1, 1:-1].reshape(n, c).min(axis=1)
+    padded[1:-1, 0] = ring[1:-1, 0].reshape(n, c).min(axis=1)
+    padded[1:-1, -1] = ring[1:-1, -1].reshape(n, c).min(axis=1)
+    cell_xy = np.argwhere(np.ones((n, n), dtype=bool))
+    surface = SURFACE_BLOCK_LUT[np.clip(cells, 0, WORLD_HEIGHT - 1)].reshape(-1)
+    heights = cells.reshape(-1)
+
+    face_parts, origin_parts, ext_parts, type_parts = [], [], [], []
+    for face_idx, ((dx, dy, dz), _, _) in enumerate(FACES):
+        if dz < 0:
+            continue
+        origin = np.zeros((n * n, 3), dtype=np.int64)
+        ext = np.ones((n * n, 3), dtype=np.int64)
+        origin[:, :2] = cell_xy * c
+        if dz > 0:
+            origin[:, 2] = heights
+            ext[:, :2] = c
+            sel = np.ones(n * n, dtype=bool)
+        else:
+            # side wall wherever the neighbouring cell (or outside surface) is lower
+            below = padded[1 + dx:n + 1 + dx, 1 + dy:n + 1 + dy].reshape(-1)
+            sel = heights > below
+            origin[:, 2] = below + 1
+            ext[:, 2] = heights - below
+            axis, other = (0, 1) if dx else (1, 0)
+            ext[:, other] = c
+            if dx + dy > 0:
+                origin[:, axis] += c - 1
+        face_parts.append(np.full(int(sel.sum()), face_idx, dtype=np.int64))
+        origin_parts.append(origin[sel])
+        ext_parts.append(ext[sel])
+        type_parts.append(surface[sel])
+    face_idx = np.concatenate(face_parts)
+    origin = np.concatenate(origin_parts)
+    ext = np.concatenate(ext_parts)
+    block_types = np.concatenate(type_parts)
+    offset = np.array([chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE, 0])
+    buffers = {}
+    for k in np.unique(block_types).tolist():
+        sel = block_types == k
+        buffers[k] = quad_vertex_arrays(face_idx[sel], origin[sel], ext[sel], offset)
+    return buffers, len(face_idx)
+
+def raycast_voxels(world_blocks, origin, direction, max_dist):
+    """Amanatides–Woo grid traversal; returns (block, entry face normal, distance) or None on a miss."""
+    length = math.sqrt(sum(d * d for d in direction))
+    if not length:
+        return None
+    direction = [d / length for d in direction]
+    pos = [int(math.floor(c)) for c in origin]
+    step = [0, 0, 0]
+    t_max = [math.inf] * 3    # ray distance at which the next boundary on each axis is crossed
+    t_delta = [math.inf] * 3  # ray distance between boundaries on each axis
+    for i in range(3):
+        if direction[i] > 0:
+            step[i] = 1
+            t_delta[i] = 1 / direction[i]
+            t_max[i] = (pos[i] + 1 - origin[i]) / direction[i]
+        elif direction[i] < 0:
+            step[i] = -1
+            t_delta[i] = -1 / direction[i]
+            t_max[i] = (pos[i] - origin[i]) / direction[i]
+    normal = (0, 0, 0)
+    t = 0.0
+    while t <= max_dist:
+        block = (pos[0], pos[1], pos[2])
+        if world_blocks.get(block) is not None:
+            return block, normal, t
+        axis = 0 if t_max[0] <= t_max[1] and t_max[0] <= t_max[2] else (1 if t_max[1] <= t_max[2] else 2)
+        t = t_max[axis]
+        pos[axis] += step[axis]
+        t_max[axis] += t_delta[axis]
+        normal = tuple(-step[axis] if i == axis else 0 for i in range(3))
+    return None
+
+def raycast_voxels_many(world_blocks, origins, directions, max_dist):
+    """raycast_voxels for N rays at once; returns (blocks, normals, distances, hit) arrays."""
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    lengths = np.linalg.norm(directions, axis=1, keepdims=True)
+    count = len(origins)
+    pos = np.floor(origins).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        directions = np.where(lengths > 0, directions / lengths, 0.0)
+        step = np.sign(directions).astype(np.int64)
+        t_delta = np.where(directions != 0, 1 / np.abs(directions), np.inf)
+        t_max = np.where(directions != 0, (pos + (step > 0) - origins) / directions, np.inf)
+    t = np.zeros(count)
+    normal = np.zeros((count, 3), dtype=np.int64)
+    blocks = np.zeros((count, 3), dtype=np.int64)
+    normals = np.zeros((count, 3), dtype=np.int64)
+    distances = np.full(count, np.inf)
+    hit = np.zeros(count, dtype=bool)
+    active = np.flatnonzero(lengths[:, 0] > 0)
+    while len(active):
+        solid = world_blocks.get_many(pos[active]) != AIR
+        done = active[solid]
+        hit[done] = True
+        blocks[done] = pos[done]
+        normals[done] = normal[done]
+        distances[done] = t[done]
+        active = active[~solid]
+        axis = np.argmin(t_max[active], axis=1)
+        t[active] = t_max[active, axis]
+        pos[active, axis] += step[active, axis]
+        t_max[active, axis] += t_delta[active, axis]
+        normal[active] = 0
+        normal[active, axis] = -step[active, axis]
+        active = active[t[active] <= max_dist]
+    return blocks, normals, distances, hit
+
+def sweep_aabb(world_blocks, box_min, box_max, delta):
+    """Move a box by delta against the voxel grid; returns (clipped delta, blocked per axis)."""
+    box_min = [float(v) for v in box_min]
+    box_max = [float(v) for v in box_max]
+    delta = [float(v) for v in delta]
+    blocked = [False, False, False]
+    lo = [math.floor(min(a, a + d)) for a, d in zip(box_min, delta)]
+    hi = [math.ceil(max(b, b + d)) for b, d in zip(box_max, delta)]
+    # every solid cell the swept box can touch, in one read
+    cells = (np.argwhere(world_blocks.get_box(lo, hi) != AIR) + lo).tolist()
+    eps = 1e-7
+    # clip one axis at a time, z first, so the box stops flush against the first
+    # block in its way however long the move; cells it already overlaps are
+    # ignored so a stuck body can walk out
+    for axis in (2, 0, 1):
+        d = delta[axis]
+        if not d or not cells:
+            continue
+        u, v = [a for a in range(3) if a != axis]
+        for cell in cells:
+            # only blocks overlapping the box's cross-section can stop it on this axis
+            if not (cell[u] < box_max[u] - eps and cell[u] + 1 > box_min[u] + eps
+                    and cell[v] < box_max[v] - eps and cell[v] + 1 > box_min[v] + eps):
+                continue
+            if d > 0:
+                gap = cell[axis] - box_max[axis]
+                if -eps <= gap < d:
+                    d = gap if gap > eps else 0.0  # already touching: don't creep by rounding error
+                    blocked[axis] = True
+            else:
+                gap = cell[axis] + 1 - box_min[axis]
+                if d < gap <= eps:
+                    d = gap if gap < -eps else 0.0
+                    blocked[axis] = True
+        delta[axis] = d
+        box_min[axis] += d
+        box_max[axis] += d
+    return delta, blocked
+
+_UNPACKED = OrderedDict()  # packed ChunkStorage -> its decoded array, most recently read last
+
+class ChunkStorage:
+    """CHUNK_SIZE³ block storage for one chunk: uniform, palette-packed or dense, used like a dict."""
+    # sections start uniform or packed (see from_array) and turn dense on the
+    # first write that changes them; like the old dict, AIR cells are absent
+    __slots__ = ("_array", "uniform", "palette", "_packed", "bits", "version", "_solid")
+    HEADER = struct.Struct("<BB")  # bits per index (0 = uniform), palette length
+
+    def __init__(self, array=None, uniform=AIR):
+        self._array = array
+        self.uniform = None if array is not None else uniform  # block id, or None when not uniform
+        self.palette = None  # bytes: block id per palette index, while packed
+        self._packed = None  # bytes: CHUNK_SIZE³ indices, `bits` each, low bits first
+        self.bits = 0
+        self.version = 0  # bumped on every write, so async meshes can spot stale input
+        self._solid = None  # solid cell count while packed, None until counted
+
+    @classmethod
+    def from_array(cls, array):
+        """Compact storage for a dense section: uniform, packed, or a dense copy."""
+        first = array.flat[0]
+        if (array == first).all():
+            return cls(uniform=int(first))
+        if not PALETTE_STORAGE:
+            return cls(array.copy())
+        return cls._packed_from(array)
+
+    @classmethod
+    def _packed_from(cls, array):
+        palette, indices = np.unique(array, return_inverse=True)
+        bits = next(b for b in (1, 2, 4, 8) if len(palette) <= 1 << b)
+        storage = cls(uniform=None)
+        storage._set_packed(palette.astype(np.uint8).tobytes(), bits,
+                            cls._pack(indices.reshape(-1).astype(np.uint8), bits))
+        storage._solid = int(np.count_nonzero(array))
+        return storage
+
+    @staticmethod
+    def _pack(indices, bits):
+        per_byte = 8 // bits
+        shifts = np.arange(0, 8, bits, dtype=np.uint8)
+        return np.bitwise_or.reduce(indices.reshape(-1, per_byte) << shifts, axis=1).tobytes()
+
+    def _set_packed(self, palette, bits, packed):
+        self.palette, self.bits, self._packed = palette, bits, packed
+        self.uniform = None
+        self._array = None
+        self._solid = None
+
+    def _unpack(self):
+        raw = np.frombuffer(self._packed, dtype=np.uint8)
+        shifts = np.arange(0, 8, self.bits, dtype=np.uint8)
+        indices = (raw[:, None] >> shifts) & ((1 << self.bits) - 1)
+        return np.frombuffer(self.palette, dtype=np.uint8)[indices.reshape((CHUNK_SIZE,) * 3)]
+
+    @property
+    def array(self):
+        """Dense cell array; read-only (a broadcast or decoded copy) unless the storage is dense."""
+        if self._array is not None:
+            return self._array
+        if self._packed is not None:
+            # main thread only: the mesher snapshot and collision read the same chunks over and over
+            array = _UNPACKED.pop(self, None)
+            if array is None:
+                array = self._unpack()
+                array.flags.writeable = False  # writes must go through dense()
+                if len(_UNPACKED) >= UNPACK_CACHE_CHUNKS:
+                    _UNPACKED.popitem(last=False)
+            _UNPACKED[self] = array
+            return array
+        return np.broadcast_to(np.uint8(self.uniform), (CHUNK_SIZE,) * 3)
+
+    def dense(self):
+        """The writable dense array, expanding a uniform or packed chunk first."""
+        if self._array is None:
+            if self._packed is not None:
+                array = self._unpack()
+            else:
+                array = np.full((CHUNK_SIZE,) * 3, self.uniform, dtype=np.uint8)
+            self._set_packed(None, 0, None)
+            self._array = array
+        return self._array
+
+    def copy(self):
+        """An independent, compact storage holding the same cells (packed data is immutable, so shared)."""
+        if self._array is not None:
+            return ChunkStorage.from_array(self._array)
+        other = ChunkStorage(uniform=self.uniform)
+        other.palette, other._packed, other.bits = self.palette, self._packed, self.bits
+        other._solid = self._solid
+        return other
+
+    def to_bytes(self):
+        """Serialize as header + palette + packed indices; dense storage is packed first."""
+        if self._array is not None:
+            first = self._array.flat[0]
+            if (self._array == first).all():
+                return ChunkStorage(uniform=int(first)).to_bytes()
+            return ChunkStorage._packed_from(self._array).to_bytes()
+        if self._packed is None:
+            return self.HEADER.pack(0, 1) + bytes([self.uniform])
+        return self.HEADER.pack(self.bits, len(self.palette)) + self.palette + self._packed
+
+    @classmethod
+    def from_bytes(cls, blob):
+        bits, count = cls.HEADER.unpack_from(blob)
+        palette = blob[cls.HEADER.size:cls.HEADER.size + count]
+        if not bits:
+            return cls(uniform=palette[0])
+        storage = cls(uniform=None)
+        storage._set_packed(palette, bits, blob[cls.HEADER.size + count:])
+        return storage
+
+    @staticmethod
+    def _in_bounds(pos):
+        x, y, z = pos
+        return 0 <= x < CHUNK_SIZE and 0 <= y < CHUNK_SIZE and 0 <= z < CHUNK_SIZE
+
+    def get(self, pos, default=None):
+        if not self._in_bounds(pos):
+            return default
+        if self._array is not None:
+            bt = int(self._array[pos])
+        elif self._packed is not None:
+            x, y, z = pos
+            cell = (x * CHUNK_SIZE + y) * CHUNK_SIZE + z
+            byte, slot = divmod(cell, 8 // self.bits)
+            bt = self.palette[(self._packed[byte] >> (slot * self.bits)) & ((1 << self.bits) - 1)]
+        else:
+            bt = self.uniform
+        return default if bt == AIR else bt
+
+    def __contains__(self, pos):
+        return self.get(pos) is not None
+
+    def __getitem__(self, pos):
+        bt = self.get(pos)
+        if bt is None:
+            raise KeyError(pos)
+        return bt
+
+    def __setitem__(self, pos, block_type):
+        if not self._in_bounds(pos):
+            raise KeyError(pos)
+        block_type = AIR if block_type is None else block_type
+        if block_type != self.uniform:
+            self.dense()[pos] = block_type
+        self.version += 1
+
+    def __delitem__(self, pos):
+        if pos not in self:
+            raise KeyError(pos)
+        self.dense()[pos] = AIR
+        self.version += 1
+
+    def pop(self, pos, default=None):
+        bt = self.get(pos)
+        if bt is None:
+            return default
+        self.dense()[pos] = AIR
+        self.version += 1
+        return bt
+
+    def items(self):
+        array = self.array
+        xs, ys, zs = np.nonzero(array)
+        return zip(zip(xs.tolist(), ys.tolist(), zs.tolist()),
+                   array[xs, ys, zs].tolist())
+
+    def __iter__(self):
+        return (pos for pos, _ in self.items())
+
+    def __len__(self):
+        if self.uniform is not None:
+            return 0 if self.uniform == AIR else CHUNK_SIZE ** 3
+        if self._array is not None:
+            return int(np.count_nonzero(self._array))
+        if self._solid is None:
+            # not through .array: that would evict the chunks the mesher and physics keep decoded
+            self._solid = int(np.count_nonzero(self._unpack()))
+        return self._solid
+
+    def clear(self):
+        self._set_packed(None, 0, None)
+        self.uniform = AIR
+        self.version += 1
+
+    def memory_usage(self):
+        """Bytes held by this storage: the object plus whichever of array / palette / indices it uses."""
+        size = sys.getsizeof(self)
+        if self._array is not None:
+            size += sys.getsizeof(self._array)
+        if self._packed is not None:
+            size += sys.getsizeof(self.palette) + sys.getsizeof(self._packed)
+        return size
+
+@functools.lru_cache(maxsize=None)
+def dict_storage_bytes(cells):
+    """Bytes the old {(x, y, z): block_type} chunk dict took for `cells` solid cells."""
+    blocks = {(i, 0, 0): 1 for i in range(cells)}
+    return sys.getsizeof(blocks) + cells * sys.getsizeof((0, 0, 0))
+
+class WorldBlocks:
+    """World-coordinate block lookups through the owning chunk; unloaded chunks read as empty."""
+    def __init__(self, chunks):
+        self.chunks = chunks  # (cx, cy, cz) -> Chunk, or None while generating
+
+    def _locate(self, pos):
+        cx, lx = divmod(int(pos[0]), CHUNK_SIZE)
+        cy, ly = divmod(int(pos[1]), CHUNK_SIZE)
+        cz, lz = divmod(int(pos[2]), CHUNK_SIZE)
+        return self.chunks.get((cx, cy, cz)), (lx, ly, lz)
+
+    def get(self, pos, default=None):
+        chunk, local = self._locate(pos)
+        if chunk is None:
+            return default
+        return chunk.blocks.get(local, default)
+
+    def __contains__(self, pos):
+        chunk, local = self._locate(pos)
+        return chunk is not None and local in chunk.blocks
+
+    def __getitem__(self, pos):
+        bt = self.get(pos)
+        if bt is None:
+            raise KeyError(pos)
+        return bt
+
+    def __setitem__(self, pos, block_type):
+        chunk, local = self._locate(pos)
+        if chunk is None:
+            raise KeyError(f"chunk for {pos} is not loaded")
+        chunk.blocks[local] = block_type
+
+    def __delitem__(self, pos):
+        chunk, local = self._locate(pos)
+        if chunk is None:
+            raise KeyError(pos)
+        del chunk.blocks[local]
+
+    def pop(self, pos, default=None):
+        chunk, local = self._locate(pos)
+        if chunk is None:
+            return default
+        return chunk.blocks.pop(local, default)
+
+    def _group_by_chunk(self, positions):
+        """Yield (chunk, row indices, local coords) for an (N, 3) int array of positions."""
+        chunk_coords = positions // CHUNK_SIZE
+        local = positions - chunk_coords * CHUNK_SIZE
+        keys, inverse = np.unique(chunk_coords, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        for i, key in enumerate(map(tuple, keys.tolist())):
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                continue
+            rows = order[bounds[i]:bounds[i + 1]]
+            yield chunk, rows, local[rows]
+
+    def versions(self, chunk_keys):
+        """(chunk, blocks.version) per key; changes once any of them is edited, loaded or unloaded."""
+        versions = []
+        for key in chunk_keys:
+            chunk = self.chunks.get(key)
+            versions.append((chunk, None if chunk is None else chunk.blocks.version))
+        return tuple(versions)
+
+    def get_many(self, positions):
+        """Look up many cells at once; returns a uint8 array with AIR for empty/unloaded cells."""
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        out = np.zeros(len(positions), dtype=np.uint8)
+        if len(positions):
+            for chunk, rows, local in self._group_by_chunk(positions):
+                blocks = chunk.blocks
+                if blocks.uniform is not None:
+                    out[rows] = blocks.uniform
+                else:
+                    out[rows] = blocks.array[local[:, 0], local[:, 1], local[:, 2]]
+        return out
+
+    def get_box(self, lo, hi):
+        """Dense uint8 copy of the cells lo <= pos < hi (AIR where unloaded), one slice per chunk."""
+        lo = [int(v) for v in lo]
+        hi = [int(v) for v in hi]
+        out = np.zeros([max(b - a, 0) for a, b in zip(lo, hi)], dtype=np.uint8)
+        if not out.size:
+            return out
+        ranges = [range(a // CHUNK_SIZE, (b - 1) // CHUNK_SIZE + 1) for a, b in zip(lo, hi)]
+        for key in itertools.product(*ranges):
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                continue
+            src, dst = [], []
+            for c, a, b in zip(key, lo, hi):
+                start, stop = max(a, c * CHUNK_SIZE), min(b, (c + 1) * CHUNK_SIZE)
+                src.append(slice(start - c * CHUNK_SIZE, stop - c * CHUNK_SIZE))
+                dst.append(slice(start - a, stop - a))
+            blocks = chunk.blocks
+            out[tuple(dst)] = blocks.uniform if blocks.uniform is not None else blocks.array[tuple(src)]
+        return out
+
+    def set_many(self, positions, block_types):
+        """Write many cells at once (None/AIR clears); returns how many, unloaded chunks skipped."""
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        if block_types is None or np.ndim(block_types) == 0:
+            block_types = [block_types] * len(positions)
+        values = np.array([AIR if bt is None else bt for bt in block_types], dtype=np.uint8)
+        written = 0
+        if len(positions):
+            for chunk, rows, local in self._group_by_chunk(positions):
+                chunk.blocks.dense()[local[:, 0], local[:, 1], local[:, 2]] = values[rows]
+                chunk.blocks.version += 1
+                written += len(rows)
+        return written
+
+MINED = 255  # block type stored on disk for a mined (None) edit
+
+def encode_chunk_edits(edits):
+    """Compress {(lx, ly, lz): block_type or None} into one zlib blob."""
+    cells = np.array([(lx * CHUNK_SIZE + ly) * CHUNK_SIZE + lz for lx, ly, lz in edits],
+                     dtype="<u2")
+    types = np.array([MINED if bt is None else bt for bt in edits.values()], dtype=np.uint8)
+    return zlib.compress(cells.tobytes() + types.tobytes())
+
+def decode_chunk_edits(blob):
+    raw = zlib.decompress(blob)
+    count = len(raw) // 3
+    cells = np.frombuffer(raw, dtype="<u2", count=count)
+    types = np.frombuffer(raw, dtype=np.uint8, offset=count * 2)
+    lx, rest = np.divmod(cells, CHUNK_SIZE * CHUNK_SIZE)
+    ly, lz = np.divmod(rest, CHUNK_SIZE)
+    return {(x, y, z): (None if bt == MINED else bt)
+            for x, y, z, bt in zip(lx.tolist(), ly.tolist(), lz.tolist(), types.tolist())}
+
+class RegionFile:
+    """One mmapped region file: a (offset, length) index per chunk slot, then the compressed blobs."""
+    MAGIC = b"CCRG"
+    VERSION = 1
+    HEADER = struct.Struct("<4sI")
+    ENTRY = struct.Struct("<II")
+    SLOTS = REGION_FILE_CHUNKS ** 3
+
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        self.lock = threading.Lock()  # compaction rewrites the file from another thread
+        self._open()
+
+    def _open(self):
+        if os.path.isfile(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version = self.HEADER.unpack_from(self.map, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                self.close()
+                raise ValueError(f"{self.path} is not a version {self.VERSION} region file")
+
+    def read(self, slot):
+        """Raw compressed blob for a slot, or None if the slot is empty."""
+        with self.lock:
+            if self.map is None:
+                return None
+            offset, length = self.ENTRY.unpack_from(self.map, self.HEADER.size + slot * self.ENTRY.size)
+            if not length:
+                return None
+            return self.map[offset:offset + length]
+
+    def slots(self):
+        return [slot for slot in range(self.SLOTS) if self.read(slot) is not None]
+
+    def write(self, blobs):
+        """Replace the file with `blobs` ({slot: compressed bytes}) via a temp file."""
+        data_start = self.HEADER.size + self.SLOTS * self.ENTRY.size
+        index = bytearray(data_start)
+        self.HEADER.pack_into(index, 0, self.MAGIC, self.VERSION)
+        offset = data_start
+        for slot, blob in sorted(blobs.items()):
+            self.ENTRY.pack_into(index, self.HEADER.size + slot * self.ENTRY.size, offset, len(blob))
+            offset += len(blob)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(index)
+            for _, blob in sorted(blobs.items()):
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        # readers only wait for the swap, not for the write above
+        with self.lock:
+            self.close()
+            os.replace(tmp, self.path)
+            self._open()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+class RegionStore:
+    """Directory of region files holding per-chunk edit lists, read lazily on demand."""
+    def __init__(self, path=WORLD_DIR):
+        self.path = path
+        self.regions = {}  # (rx, ry, rz) -> RegionFile, opened on first use
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def locate(chunk_key):
+        """Return ((rx, ry, rz), slot) for a chunk key."""
+        n = REGION_FILE_CHUNKS
+        rkey, local = zip(*(divmod(c, n) for c in chunk_key))
+        return rkey, (local[0] * n + local[1]) * n + local[2]
+
+    def _region(self, rkey):
+        with self.lock:
+            region = self.regions.get(rkey)
+            if region is None:
+                path = os.path.join(self.path, "r.%d.%d.%d.cube" % rkey)
+                region = self.regions[rkey] = RegionFile(path)
+            return region
+
+    def read_chunk(self, chunk_key):
+        """That chunk's {(lx, ly, lz): block_type or None}, or None if nothing is saved."""
+        rkey, slot = self.locate(chunk_key)
+        blob = self._region(rkey).read(slot)
+        return None if blob is None else decode_chunk_edits(blob)
+
+    def write_chunks(self, chunk_edits):
+        """Store {chunk_key: edits}; each touched region file is rewritten once."""
+        by_region = {}
+        for key, edits in chunk_edits.items():
+            rkey, slot = self.locate(key)
+            by_region.setdefault(rkey, {})[slot] = edits
+        os.makedirs(self.path, exist_ok=True)
+        for rkey, slots in by_region.items():
+            region = self._region(rkey)
+            # untouched chunks are copied over still compressed
+            blobs = {slot: region.read(slot) for slot in region.slots()}
+            for slot, edits in slots.items():
+                if edits:
+                    blobs[slot] = encode_chunk_edits(edits)
+                else:
+                    blobs.pop(slot, None)
+            region.write(blobs)
+
+    def chunk_keys(self):
+        """Every chunk key with saved edits on disk."""
+        if not os.path.isdir(self.path):
+            return
+        n = REGION_FILE_CHUNKS
+        for name in os.listdir(self.path):
+            parts = name.split(".")
+            if len(parts) != 5 or parts[0] != "r" or parts[4] != "cube":
+                continue
+            rx, ry, rz = map(int, parts[1:4])
+            for slot in self._region((rx, ry, rz)).slots():
+                lxy, lz = divmod(slot, n)
+                lx, ly = divmod(lxy, n)
+                yield (rx * n + lx, ry * n + ly, rz * n + lz)
+
+    def close(self):
+        with self.lock:
+            for region in self.regions.values():
+                region.close()
+            self.regions.clear()
+
+def read_legacy_edits(filename=LEGACY_WORLD_FILE):
+    """Parse a world.dat of flat <iiiB records into {(x, y, z): block_type or None}."""
+    with open(filename, "rb") as f:
+        data = f.read()
+    if len(data) < 4:
+        return {}
+    (count,) = struct.unpack_from("<I", data)
+    record = np.dtype([("x", "<i4"), ("y", "<i4"), ("z", "<i4"), ("bt", "u1")])
+    count = min(count, (len(data) - 4) // record.itemsize)
+    rows = np.frombuffer(data, dtype=record, count=count, offset=4)
+    return {(x, y, z): (None if bt == MINED else bt)
+            for x, y, z, bt in zip(rows["x"].tolist(), rows["y"].tolist(),
+                                   rows["z"].tolist(), rows["bt"].tolist())}
+
+def convert_legacy_world(src=LEGACY_WORLD_FILE, dst=WORLD_DIR):
+    """One-shot conversion of a world.dat into region files; returns the edit count."""
+    edits = SavedEdits(RegionStore(dst))
+    for pos, bt in read_legacy_edits(src).items():
+        edits[pos] = bt
+    edits.save()
+    edits.store.close()
+    log.info("Converted %d edits from %s into %s", len(edits), src, dst)
+    return len(edits)
+
+class EditJournal:
+    """Append-only log of edits as <iiiB records (255 = mined), the same as world.dat's."""
+    RECORD = struct.Struct("<iiiB")
+
+    def __init__(self, path):
+        self.path = path
+        self.rotated_path = path + ".compacting"
+        self.next_path = path + ".next"  # rotated while an older rotated log was left over
+        self.lock = threading.Lock()  # held for buffer writes and file swaps only, never an fsync
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.merge_parked()  # in case we crashed between rotate() and finish_rotate()
+        self.file = open(path, "ab")
+        self.size = self.file.tell()
+        self.unsynced = 0  # records appended since the last fsync
+
+    def append(self, pos, block_type):
+        record = self.RECORD.pack(int(pos[0]), int(pos[1]), int(pos[2]),
+                                  MINED if block_type is None else block_type)
+        with self.lock:
+            self.file.write(record)
+            self.size += len(record)
+            self.unsynced += 1
+
+    def sync(self):
+        with self.lock:
+            if not self.unsynced:
+                return 0
+            self.file.flush()
+            # fsync a duplicate after releasing the lock; it stays valid if rotate() closes the file
+            fd = os.dup(self.file.fileno())
+            synced, self.unsynced = self.unsynced, 0
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return synced
+
+    def rotate(self):
+        """Move the current log aside and reopen; returns the old file for finish_rotate()."""
+        with self.lock:
+            self.file.flush()
+            old = self.file
+            # an earlier compaction never finished: park this log until it is appended to that one
+            target = self.next_path if os.path.exists(self.rotated_path) else self.rotated_path
+            os.replace(self.path, target)
+            self.file = open(self.path, "ab")
+            self.size = 0
+            self.unsynced = 0
+        return old
+
+    def finish_rotate(self, old):
+        """fsync and close the log rotate() moved aside, merging it into rotated_path if parked."""
+        try:
+            os.fsync(old.fileno())
+        finally:
+            old.close()
+        self.merge_parked()
+
+    def merge_parked(self):
+        """Append a log rotate() parked at next_path to rotated_path, whose records stay in front."""
+        if not os.path.exists(self.next_path):
+            return
+        with open(self.next_path, "rb") as src, open(self.rotated_path, "ab") as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(self.next_path)
+
+    def discard_rotated(self):
+        """The rotated log's edits are in the region files now."""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def replay(self):
+        """Yield every logged (pos, block_type) in write order, oldest log first."""
+        for path in (self.rotated_path, self.next_path, self.path):
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            # a torn record at the end (crash mid-write) is ignored
+            for x, y, z, bt in self.RECORD.iter_unpack(data[:len(data) - len(data) % self.RECORD.size]):
+                yield (x, y, z), (None if bt == MINED else bt)
+
+    def close(self):
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+class JournalCompactor(threading.Thread):
+    """Background thread: batched journal fsyncs and periodic compaction into region files."""
+    def __init__(self, saved_edits):
+        super().__init__(name="journal-compactor", daemon=True)
+        self.saved_edits = saved_edits
+        self.stopping = threading.Event()
+        self.last_compaction = time.monotonic()
+
+    def run(self):
+        journal = self.saved_edits.journal
+        while not self.stopping.wait(JOURNAL_SYNC_INTERVAL):
+            try:
+                journal.sync()
+                if (journal.size >= JOURNAL_COMPACT_BYTES or
+                        time.monotonic() - self.last_compaction >= JOURNAL_COMPACT_INTERVAL):
+                    self.saved_edits.save()
+                    self.last_compaction = time.monotonic()
+            except OSError as e:
+                log.error("Journal maintenance failed: %r", e)
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+
+class SavedEdits:
+    """Saved block edits, {(wx, wy, wz): block_type}, indexed by chunk; None marks a mined block."""
+    def __init__(self, store=None, journal=None):
+        self.store = store      # RegionStore: a chunk's edits are read on first use, released when clean
+        self.journal = journal  # EditJournal: every edit is appended; save() folds it into the store
+        self.by_chunk = {}  # (cx, cy, cz) -> {(lx, ly, lz): block_type or None}, in memory
+        self.dirty = set()  # chunk keys changed since the last save()
+        self.saving = set() # chunk keys being written by a save() in progress
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _locate(pos):
+        cx, lx = divmod(int(pos[0]), CHUNK_SIZE)
+        cy, ly = divmod(int(pos[1]), CHUNK_SIZE)
+        cz, lz = divmod(int(pos[2]), CHUNK_SIZE)
+        return (cx, cy, cz), (lx, ly, lz)
+
+    def chunk_edits(self, chunk_key):
+        """{(lx, ly, lz): block_type or None} for one chunk (empty if it has no edits)."""
+        edits = self.by_chunk.get(chunk_key)
+        if edits is None and self.store is not None:
+            edits = self.store.read_chunk(chunk_key)
+            if edits is not None:
+                self.by_chunk[chunk_key] = edits
+        return edits if edits is not None else {}
+
+    def __setitem__(self, pos, block_type):
+        self._set(pos, block_type)
+        if self.journal is not None:
+            self.journal.append(pos, block_type)
+
+    def _set(self, pos, block_type):
+        key, local = self._locate(pos)
+        edits = self.chunk_edits(key)
+        with self.lock:
+            if key not in self.by_chunk:
+                edits = self.by_chunk[key] = {}
+            edits[local] = block_type
+            self.dirty.add(key)
+
+    def replay_journal(self):
+        """Re-apply edits logged after the last save; returns how many were replayed."""
+        count = 0
+        for pos, block_type in self.journal.replay():
+            self._set(pos, block_type)
+            count += 1
+        return count
+
+    def __getitem__(self, pos):
+        key, local = self._locate(pos)
+        return self.chunk_edits(key)[local]
+
+    def get(self, pos, default=None):
+        key, local = self._locate(pos)
+        return self.chunk_edits(key).get(local, default)
+
+    def __contains__(self, pos):
+        key, local = self._locate(pos)
+        return local in self.chunk_edits(key)
+
+    def chunk_keys(self):
+        keys = set(self.by_chunk)
+        if self.store is not None:
+            keys.update(self.store.chunk_keys())
+        return keys
+
+    def __len__(self):
+        return sum(len(self.chunk_edits(key)) for key in self.chunk_keys())
+
+    def items(self):
+        for key in self.chunk_keys():
+            cx, cy, cz = key
+            for (lx, ly, lz), bt in self.chunk_edits(key).items():
+                yield (cx * CHUNK_SIZE + lx, cy * CHUNK_SIZE + ly, cz * CHUNK_SIZE + lz), bt
+
+    def keys(self):
+        return (pos for pos, _ in self.items())
+
+    __iter__ = keys
+
+    def apply_to(self, chunk):
+        """Write this chunk's edits into its block storage; returns how many were applied."""
+        edits = self.chunk_edits((chunk.chunk_x, chunk.chunk_y, chunk.chunk_z))
+        for local, bt in edits.items():
+            # None = mined out, anything else = placed or replaced
+            chunk.blocks[local] = bt
+        return len(edits)
+
+    def release(self, chunk_key):
+        """Drop a chunk's edits from memory unless they still need saving."""
+        with self.lock:
+            if (self.store is not None and chunk_key not in self.dirty
+                    and chunk_key not in self.saving):
+                self.by_chunk.pop(chunk_key, None)
+
+    def save(self):
+        """Write every changed chunk to the store; returns how many chunks were written."""
+        if self.store is None:
+            return 0
+        if self.journal is not None:
+            self.journal.merge_parked()  # left by a failed save; rotate() must not overwrite it
+        # only the snapshot and the journal's file swap hold the lock, so this can
+        # run on a background thread while edits keep coming in
+        with self.lock:
+            if not self.dirty:
+                return 0
+            snapshot = {key: dict(self.by_chunk.get(key, {})) for key in self.dirty}
+            self.saving = set(snapshot)
+            self.dirty.clear()
+            rotated = self.journal.rotate() if self.journal is not None else None
+        try:
+            if rotated is not None:
+                self.journal.finish_rotate(rotated)
+            self.store.write_chunks(snapshot)
+        except BaseException:
+            with self.lock:
+                # still covered by the rotated journal; retried by the next save()
+                self.dirty.update(snapshot)
+            raise
+        finally:
+            self.saving = set()
+        if self.journal is not None:
+            self.journal.discard_rotated()
+        return len(snapshot)
+
+class ChunkCache:
+    """LRU cache of evicted chunks' blocks and meshes, spilling past CHUNK_CACHE_BYTES to disk."""
+    def __init__(self, max_bytes=None, max_disk_bytes=None):
+        self.max_bytes = CHUNK_CACHE_BYTES if max_bytes is None else max_bytes
+        self.max_disk_bytes = CHUNK_CACHE_DISK_BYTES if max_disk_bytes is None else max_disk_bytes
+        self.entries = OrderedDict()  # key -> (ChunkStorage, mesh or None, bytes), oldest first
+        self.bytes = 0
+        self.spilled = OrderedDict()  # key -> bytes on disk, oldest first
+        self.disk_bytes = 0
+        self.dir = None               # created on the first spill
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _entry_bytes(blocks, mesh):
+        size = blocks.memory_usage()
+        if mesh is not None:
+            # vertex rows and triangle indices held by the mesh's Geoms
+            size += mesh[1] * (4 * VERTEX_STRIDE * 4 + 6 * 4)
+        return size
+
+    def _path(self, key):
+        return os.path.join(self.dir, "c.%d.%d.%d.bin" % key)
+
+    def put(self, key, blocks, mesh=None):
+        """Cache an evicted chunk's storage; `mesh` comes from Chunk.detach_mesh()."""
+        self._discard_spilled(key)
+        size = self._entry_bytes(blocks, mesh)
+        self.entries[key] = (blocks, mesh, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self.entries:
+            self._spill(*self.entries.popitem(last=False))
+
+    def take(self, key):
+        """Remove and return (ChunkStorage, mesh or None) for a chunk, or None on a miss."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.hits += 1
+            self.bytes -= entry[2]
+            return entry[0], entry[1]
+        if key in self.spilled:
+            self.disk_hits += 1
+            with open(self._path(key), "rb") as f:
+                blocks = ChunkStorage.from_bytes(zlib.decompress(f.read()))
+            self._discard_spilled(key)
+            return blocks, None
+        self.misses += 1
+        return None
+
+    def _spill(self, key, entry):
+        blocks, mesh, size = entry
+        self.bytes -= size
+        if mesh is not None:
+            mesh[0].removeNode()  # only blocks go to disk; the mesh is rebuilt when it returns
+        if self.dir is None:
+            self.dir = tempfile.mkdtemp(prefix="cubecraft-cache-")
+        blob = zlib.compress(blocks.to_bytes())
+        with open(self._path(key), "wb") as f:
+            f.write(blob)
+        self.spilled[key] = len(blob)
+        self.disk_bytes += len(blob)
+        while self.disk_bytes > self.max_disk_bytes and self.spilled:
+            self._discard_spilled(next(iter(self.spilled)))
+
+    def _discard_spilled(self, key):
+        size = self.spilled.pop(key, None)
+        if size is not None:
+            self.disk_bytes -= size
+            os.remove(self._path(key))
+
+    def stats(self):
+        """Return (chunks in memory, bytes in memory, chunks on disk, hits, disk hits, misses)."""
+        return (len(self.entries), self.bytes, len(self.spilled),
+                self.hits, self.disk_hits, self.misses)
+
+    def close(self):
+        for _, mesh, _ in self.entries.values():
+            if mesh is not None:
+                mesh[0].removeNode()
+        self.entries.clear()
+        self.spilled.clear()
+        if self.dir is not None:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None
+
+class Region:
+    """Scene-graph parent for REGION_SIZE x REGION_SIZE chunk columns."""
+    def __init__(self, parent, key):
+        self.key = key
+        self.node = parent.attachNewNode(f"region-{key[0]}-{key[1]}")
+        self.live = self.node.attachNewNode("live")  # the chunk nodes themselves
+        self.batch = None  # flattened copy of their meshes once quiet; `live` is stashed meanwhile
+        self.members = set()    # chunk and LOD column keys parented under this region
+        self.changed_at = None  # frame time of the last change, None when batched
+
+    def unbatch(self, now):
+        # show the live chunk nodes again so the change is visible right away
+        if self.batch is not None:
+            self.batch.removeNode()
+            self.batch = None
+            self.live.unstash()
+        self.changed_at = now
+
+    def rebatch(self, lookup):
+        batch = NodePath("batch")
+        for key in self.members:
+            member = lookup(key)
+            if member is not None and member.mesh_np is not None:
+                member.mesh_np.copyTo(batch)
+        # combine every Geom that shares a texture/state into as few as possible
+        batch.flattenStrong()
+        batch.reparentTo(self.node)
+        self.live.stash()
+        self.batch = batch
+        self.changed_at = None
+
+    def draw_calls(self, lookup):
+        if self.batch is not None:
+            return sum(gn.node().getNumGeoms()
+                       for gn in self.batch.findAllMatches("**/+GeomNode"))
+        members = (lookup(k) for k in self.members)
+        return sum(m.geom_count for m in members if m is not None)
+
+class RegionBatcher:
+    """Groups chunks and LOD columns into regions and re-batches only regions that changed."""
+    def __init__(self, app, chunks, lod_columns):
+        self.app = app
+        self.chunks = chunks
+        self.lod_columns = lod_columns
+        self.regions = {}  # (rx, ry) -> Region
+        self.root = app.render.attachNewNode("regions")
+
+    @staticmethod
+    def region_key(chunk_key):
+        return (chunk_key[0] // REGION_SIZE, chunk_key[1] // REGION_SIZE)
+
+    def _member(self, key):
+        return (self.chunks if len(key) == 3 else self.lod_columns).get(key)
+
+    def _now(self):
+        return ClockObject.getGlobalClock().getFrameTime()
+
+    def parent_for(self, chunk_key):
+        """Node a new chunk should attach under."""
+        if not REGION_BATCHING:
+            return self.app.render
+        rkey = self.region_key(chunk_key)
+        region = self.regions.get(rkey)
+        if region is None:
+            region = self.regions[rkey] = Region(self.root, rkey)
+        region.members.add(chunk_key)
+        region.unbatch(self._now())
+        return region.live
+
+    def chunk_changed(self, chunk_key):
+        region = self.regions.get(self.region_key(chunk_key))
+        if region is not None:
+            region.unbatch(self._now())
+
+    def chunk_removed(self, chunk_key):
+        rkey = self.region_key(chunk_key)
+        region = self.regions.get(rkey)
+        if region is None:
+            return
+        region.members.discard(chunk_key)
+        if region.members:
+            region.unbatch(self._now())
+        else:
+            region.node.removeNode()
+            del self.regions[rkey]
+
+    def update(self, task):
+        # re-batch the region that has been quiet the longest, one per frame
+        now = self._now()
+        ready = [r for r in self.regions.values()
+                 if r.changed_at is not None and now - r.changed_at >= REGION_REBATCH_DELAY]
+        if ready:
+            min(ready, key=lambda r: r.changed_at).rebatch(self._member)
+        return task.cont
+
+    def stats(self):
+        """Return (batched regions, total regions, draw calls for all chunk geometry)."""
+        batched = sum(1 for r in self.regions.values() if r.batch is not None)
+        draws = sum(r.draw_calls(self._member) for r in self.regions.values())
+        return batched, len(self.regions), draws
+
+class LodColumn:
+    """Coarse stand-in for a whole far chunk column; geometry only, no blocks."""
+    def __init__(self, base, chunk_x, chunk_y, buffers, quad_count, parent):
+        self.node = parent.attachNewNode(f"lod-{chunk_x}-{chunk_y}")
+        self.mesh_np = self.node.attachNewNode("mesh")
+        for k, (rows, indices) in buffers.items():
+            name = BLOCK_TYPES[k]['name']
+            node = GeomNode(f"lod_mesh_{name}")
+            node.addGeom(make_geom(f'lod_{name}', rows, indices))
+            self.mesh_np.attachNewNode(node).setTexture(base.tex_dict[k])
+        self.geom_count = len(buffers)
+        self.quad_count = quad_count
+
+    def destroy(self):
+        self.node.removeNode()
+
 class Chunk:
-    def __init__(self, base, chunk_x, chunk_y, chunk_z, tex_dict, world_blocks):
+    def __init__(self, base, chunk_x, chunk_y, chunk_z, tex_dict, world_blocks, parent=None):
         self.chunk_x = chunk_x
         self.chunk_y = chunk_y
         self.chunk_z = chunk_z
         self.base = base
-        self.node = base.render.attachNewNode(f"chunk-{chunk_x}-{chunk_y}-{chunk_z}")
-        self.blocks = {}  # (x, y, z): block_type, local coords
+        if parent is None:
+            parent = base.render
+        self.node = parent.attachNewNode(f"chunk-{chunk_x}-{chunk_y}-{chunk_z}")
+        self.blocks = ChunkStorage()  # (x, y, z) local coords -> block_type
         self.tex_dict = tex_dict
         self.world_blocks = world_blocks
-        self.pending_planes = [(z) for z in range(CHUNK_SIZE)]  # planes to build (z)
+        self.face_count = 0   # exposed faces (= quads the naive mesher would emit)
+        self.quad_count = 0   # quads actually emitted by the last build_mesh
+        self.mesh_np = None   # NodePath holding the current mesh geometry
+        self.geom_count = 0   # Geoms (= draw calls) in the current mesh
+        self.mesh_seq = 0     # id of the newest async mesh request
+        self.mesh_version = None  # blocks.version the current mesh was built from
+        self.meshed_without = frozenset()  # FACES normals of neighbours missing at the last mesh
+        self.meshed = False
 
     @classmethod
-    def from_block_data(cls, base, chunk_x, chunk_y, chunk_z, tex_dict, block_data, world_blocks):
-        chunk = cls(base, chunk_x, chunk_y, chunk_z, tex_dict, world_blocks)
+    def from_block_data(cls, base, chunk_x, chunk_y, chunk_z, tex_dict, block_data, world_blocks,
+                        parent=None):
+        chunk = cls(base, chunk_x, chunk_y, chunk_z, tex_dict, world_blocks, parent)
         chunk.blocks = block_data
-        chunk.pending_planes = []
         return chunk
 
-    def process_next_plane(self):
-        if not self.pending_planes:
-            return False
-        z = self.pending_planes.pop(0)
-        wz = self.chunk_z * CHUNK_SIZE + z
-        for x in range(CHUNK_SIZE):
-            wx = self.chunk_x * CHUNK_SIZE + x
-            for y in range(CHUNK_SIZE):
-                wy = self.chunk_y * CHUNK_SIZE + y
-                height = get_terrain_height(wx, wy, SCALE, OCTAVES, PERSISTENCE, LACUNARITY)
-                block_type = None
-                if wz > height:
-                    continue
-                elif wz == height:
-                    if height >= 20:
-                        block_type = 5  # snow
-                    elif height >= 15:
-                        block_type = 3  # stone
-                    elif height >= 6:
-                        block_type = 2  # grass
-                    else:
-                        block_type = 4  # sand
-                elif wz < 2:
-                    block_type = 3  # always stone below sea level
-                else:
-                    if height >= 15:
-                        block_type = 3  # stone
-                    elif height >= 6:
-                        block_type = 1  # dirt
-                    else:
-                        block_type = 4  # more sand
-                self.blocks[(x, y, z)] = block_type
-                if self.world_blocks is not None:
-                    self.world_blocks[(wx, wy, wz)] = block_type
-        log.debug("Chunk %d,%d,%d plane %d generated", self.chunk_x,self.chunk_y,self.chunk_z, z)
-        return bool(self.pending_planes)
-
-    def is_ready(self):
-        return not self.pending_planes
-
     @staticmethod
     def generate_blocks_data(chunk_x, chunk_y, chunk_z):
         blocks = {}
@@ -184,76 +1756,95 @@ class Chunk:
                     blocks[(x, y, z)] = block_type
         return blocks
 
+    def padded_solid(self):
+        """Solid mask of this chunk plus a one-cell border from its neighbours, indexed [x+1, y+1, z+1]."""
+        n = CHUNK_SIZE
+        if self.world_blocks is None:
+            solid = np.zeros((n + 2,) * 3, dtype=bool)
+        else:
+            origin = [c * n - 1 for c in (self.chunk_x, self.chunk_y, self.chunk_z)]
+            solid = self.world_blocks.get_box(origin, [o + n + 2 for o in origin]) != AIR
+        solid[1:-1, 1:-1, 1:-1] = self.blocks.array != AIR
+        return solid
+
+    def missing_neighbours(self):
+        """FACES normals of the adjacent sections that can exist but are not loaded."""
+        # their cells read as air, so faces toward them stay until a re-mesh with them present
+        if self.world_blocks is None:
+            return frozenset()
+        missing = []
+        for (dx, dy, dz), _, _ in FACES:
+            cz = self.chunk_z + dz
+            if not 0 <= cz < COLUMN_SECTIONS:
+                continue  # nothing is ever generated there
+            if self.world_blocks.chunks.get((self.chunk_x + dx, self.chunk_y + dy, cz)) is None:
+                missing.append((dx, dy, dz))
+        return frozenset(missing)
+
+    def mesh_snapshot(self):
+        """Copy everything the worker-side mesher needs: (version, args for mesh_buffers)."""
+        # an all-air chunk has no faces whichever neighbours turn up
+        self.meshed_without = frozenset() if self.blocks.uniform == AIR else self.missing_neighbours()
+        offset = np.array([self.chunk_x, self.chunk_y, self.chunk_z]) * CHUNK_SIZE
+        atlas_uvs = self.base.atlas_uvs if TEXTURE_ATLAS else None
+        return self.blocks.version, (self.blocks.array.copy(), self.padded_solid(),
+                                     MESH_MODE == "greedy", offset, atlas_uvs)
+
+    def mesh_is_empty(self, padded_solid):
+        """True when no face can be exposed: uniform air, or uniform solid enclosed on every side."""
+        if self.blocks.uniform is None:
+            return False
+        return self.blocks.uniform == AIR or bool(padded_solid.all())
+
     def build_mesh(self, force_cull=False):
+        """Mesh synchronously on the calling (main) thread."""
         if force_cull:
             log.debug("CULL-pass → Rebuilding chunk %s", (self.chunk_x, self.chunk_y, self.chunk_z))
         if self.node.isEmpty():
             return
-        self.node.node().removeAllChildren()
-        mesh_data = {}
-        idxs = {}
-        for k in BLOCK_TYPES:
-            fmt = GeomVertexFormat.getV3n3t2()
-            vdata = GeomVertexData(f'chunk_{BLOCK_TYPES[k]["name"]}', fmt, Geom.UHStatic)
-            mesh_data[k] = {
-                'vdata': vdata,
-                'vertex': GeomVertexWriter(vdata, 'vertex'),
-                'normal': GeomVertexWriter(vdata, 'normal'),
-                'texcoord': GeomVertexWriter(vdata, 'texcoord'),
-                'triangles': GeomTriangles(Geom.UHStatic),
-            }
-            idxs[k] = 0
-
-        for pos, block_type in self.blocks.items():
-            # skip “mined out” marker entries
-            if block_type is None:
-                continue
-            x, y, z = pos
-            wx = self.chunk_x * CHUNK_SIZE + x
-            wy = self.chunk_y * CHUNK_SIZE + y
-            wz = self.chunk_z * CHUNK_SIZE + z
-            for face_idx, (face_dir, face_name, verts) in enumerate(FACES):
-                nx, ny, nz = face_dir
-                nwx, nwy, nwz = wx + nx, wy + ny, wz + nz
-                # if face_name == "bottom":
-                #     continue
-                if force_cull:
-                    if (nwx, nwy, nwz) in self.world_blocks:
-                        continue
-                if (nwx, nwy, nwz) not in self.world_blocks:
-                    m = mesh_data[block_type]
-                    idx = idxs[block_type]
-                    for vert_idx, (vx, vy, vz) in enumerate(verts):
-                        vwx = wx + vx
-                        vwy = wy + vy
-                        vwz = wz + vz
-                        m['vertex'].addData3(vwx, vwy, vwz)
-                        m['normal'].addData3(nx, ny, nz)
-                        u, v_uv = FACE_UVS[face_idx][vert_idx]
-                        m['texcoord'].addData2(u, v_uv)
-                    m['triangles'].addVertices(idx, idx + 1, idx + 2)
-                    m['triangles'].addVertices(idx, idx + 2, idx + 3)
-                    m['triangles'].closePrimitive()
-                    idxs[block_type] += 4
+        version, args = self.mesh_snapshot()
+        self.apply_mesh(*(EMPTY_MESH if self.mesh_is_empty(args[1]) else mesh_buffers(*args)))
+        self.mesh_version = version
 
-        for k in BLOCK_TYPES:
-            if idxs[k] > 0:
-                geom = Geom(mesh_data[k]['vdata'])
-                geom.addPrimitive(mesh_data[k]['triangles'])
-                node = GeomNode(f"chunk_mesh_{BLOCK_TYPES[k]['name']}")
-                node.addGeom(geom)
-                np = self.node.attachNewNode(node)
-                np.setTexture(self.tex_dict[k])
+    def apply_mesh(self, buffers, quad_count, face_count):
+        """Main-thread stage: wrap raw buffers in GeomNodes and swap them in at once."""
+        if self.node.isEmpty():
+            return
+        mesh_root = NodePath("mesh")
+        for k, (rows, indices) in buffers.items():
+            name = "atlas" if k == ATLAS_MESH else BLOCK_TYPES[k]['name']
+            node = GeomNode(f"chunk_mesh_{name}")
+            node.addGeom(make_geom(f'chunk_{name}', rows, indices))
+            mesh_np = mesh_root.attachNewNode(node)
+            mesh_np.setTexture(self.base.atlas_tex if k == ATLAS_MESH else self.tex_dict[k])
+        self.geom_count = len(buffers)
+        # the old geometry stays up until the new one is attached, in the same frame
+        mesh_root.reparentTo(self.node)
+        if self.mesh_np is not None:
+            self.mesh_np.removeNode()
+        self.mesh_np = mesh_root
+        self.quad_count = quad_count
+        self.face_count = face_count
+        self.meshed = True
+
+    def detach_mesh(self):
+        """Unhook the current mesh so it can outlive this chunk's node; None if it is out of date."""
+        if self.mesh_np is None or self.mesh_version != self.blocks.version:
+            return None
+        mesh = (self.mesh_np, self.quad_count, self.face_count, self.geom_count,
+                self.meshed_without, (MESH_MODE, TEXTURE_ATLAS))
+        self.mesh_np.detachNode()
+        self.mesh_np = None
+        return mesh
+
+    def attach_mesh(self, mesh):
+        """Reuse a mesh from detach_mesh(); it must have been built for these blocks."""
+        self.mesh_np, self.quad_count, self.face_count, self.geom_count, self.meshed_without, _ = mesh
+        self.mesh_np.reparentTo(self.node)
+        self.mesh_version = self.blocks.version
+        self.meshed = True
 
     def destroy(self):
-        if self.world_blocks is not None:
-            for pos in self.blocks:
-                x, y, z = pos
-                wx = self.chunk_x * CHUNK_SIZE + x
-                wy = self.chunk_y * CHUNK_SIZE + y
-                wz = self.chunk_z * CHUNK_SIZE + z
-                if (wx, wy, wz) in self.world_blocks:
-                    del self.world_blocks[(wx, wy, wz)]
         self.node.removeNode()
         self.blocks.clear()
 
@@ -273,6 +1864,11 @@ class PlayerController:
         self.globalClock = self.app.globalClock
         self.player_vel = Vec3(0, 0, 0)
         self.is_on_ground = False
+        # fixed-step physics state: feet position now and one step ago, interpolated for the camera
+        self.body_pos = None
+        self.prev_body_pos = None
+        self.physics_time = 0.0  # unsimulated time carried to the next frame
+        self.camera_set = None   # where we last put the camera; anything else is a teleport
         self.app.accept("space", self.try_jump)
         self.no_clip = False
         self.app.accept("f", self.toggle_clip)     # press F to toggle
@@ -299,17 +1895,17 @@ class PlayerController:
         self.render_distance = RENDER_DISTANCE
     
     def play_footstep(self):
-        print("▶play_footstep called") 
         # find the block directly under the player
         x, y, _ = self.app.camera.getPos()
-        h = get_terrain_height(x, y, SCALE, OCTAVES, PERSISTENCE, LACUNARITY)
-        print("play_footstep: player pos:", x, y, h)
-        block_pos = (math.floor(x), math.floor(y), math.floor(h))
-        print("play_footstep: block_pos:", block_pos)
+        h = self.app.world_manager.column_heights.top_solid(x, y)
+        if h is None:
+            return
+        if self.body_pos is not None and h >= self.body_pos[2]:
+            h = math.floor(self.body_pos[2]) - 1  # under a roof: the block underfoot, not the top one
+        block_pos = (math.floor(x), math.floor(y), h)
         block_type = self.app.world_manager.world_blocks.get(block_pos)
-        print("play_footstep: block_type:", block_type)
         sfx = self.footstep_sounds.get(block_type)
-        print("play_footstep: sfx:", sfx)
+        log.debug("Footstep on %s at %s", block_type, block_pos)
         if not sfx:
             return
         
@@ -336,16 +1932,23 @@ class PlayerController:
             self.player_vel.z = JUMP_VELOCITY
             self.is_on_ground = False
 
-    def is_blocked_at(self, x, y, z):
-        for dx in [-PLAYER_RADIUS, PLAYER_RADIUS]:
-            for dy in [-PLAYER_RADIUS, PLAYER_RADIUS]:
-                for dz in [0, PLAYER_HEIGHT]:
-                    bx = int(math.floor(x + dx))
-                    by = int(math.floor(y + dy))
-                    bz = int(math.floor(z + dz) - 3)
-                    if (bx, by, bz) in self.app.world_manager.world_blocks:
-                        return True
-        return False
+    def physics_step(self, wish, speed, dt):
+        """Advance the player body by one fixed step; return True if it moved sideways."""
+        self.player_vel.z -= GRAVITY * dt
+        if self.player_vel.z < -GRAVITY:
+            self.player_vel.z = -GRAVITY
+        x, y, z = self.body_pos
+        delta = (wish.x * speed * dt, wish.y * speed * dt, self.player_vel.z * dt)
+        moved, blocked = sweep_aabb(
+            self.app.world_manager.world_blocks,
+            (x - PLAYER_RADIUS, y - PLAYER_RADIUS, z),
+            (x + PLAYER_RADIUS, y + PLAYER_RADIUS, z + PLAYER_HEIGHT),
+            delta)
+        self.body_pos = (x + moved[0], y + moved[1], z + moved[2])
+        self.is_on_ground = blocked[2] and delta[2] < 0
+        if blocked[2]:
+            self.player_vel.z = 0
+        return bool(moved[0] or moved[1])
 
     def update_camera(self, task):
         if self.app.paused:
@@ -371,9 +1974,6 @@ class PlayerController:
             move += right
         if move.length() > 0:
             move.normalize()
-            # Choose speed: flycam vs. normal
-            speed = fly_speed if self.no_clip else speed
-            move *= speed * dt
         
         if self.app.mouseWatcherNode.hasMouse():
             md = self.app.win.getPointer(0)
@@ -390,35 +1990,25 @@ class PlayerController:
 
         if self.no_clip:
             # simply move the camera with no gravity or collision
-            cam.setPos(pos + move)
+            cam.setPos(pos + move * fly_speed * dt)
+            self.camera_set = None
             return task.cont
 
-        self.player_vel.z -= GRAVITY * dt
-        if self.player_vel.z < -GRAVITY:
-            self.player_vel.z = -GRAVITY
-
-        proposed = pos + move
-        proposed.z += self.player_vel.z * dt
-
-        self.is_on_ground = False
-
-        next_xy = Vec3(proposed.x, proposed.y, pos.z)
-        blocked_xy = self.is_blocked_at(next_xy.x, next_xy.y, next_xy.z)
-        if not blocked_xy:
-            pos.x, pos.y = next_xy.x, next_xy.y
-        next_z = Vec3(pos.x, pos.y, proposed.z)
-        blocked_z = self.is_blocked_at(next_z.x, next_z.y, next_z.z)
-        if not blocked_z:
-            pos.z = next_z.z
-        else:
-            if self.player_vel.z < 0:
-                self.is_on_ground = True
-                self.player_vel.z = 0
-                pos.z = math.floor(pos.z + 0.01)
-            elif self.player_vel.z > 0:
-                self.player_vel.z = 0
-        
-        moved = move.length() > 0 and not blocked_xy
+        if self.camera_set is None or (pos - self.camera_set).length() > 1e-4:
+            # the camera was placed by someone else (spawn, load, no-clip): restart from there
+            self.body_pos = self.prev_body_pos = (pos.x, pos.y, pos.z - PLAYER_EYE_HEIGHT)
+            self.physics_time = 0.0
+
+        self.physics_time += dt
+        moved = False
+        steps = 0
+        while self.physics_time >= PHYSICS_STEP and steps < MAX_PHYSICS_STEPS:
+            self.prev_body_pos = self.body_pos
+            moved = self.physics_step(move, speed, PHYSICS_STEP) or moved
+            self.physics_time -= PHYSICS_STEP
+            steps += 1
+        if steps == MAX_PHYSICS_STEPS:
+            self.physics_time = min(self.physics_time, PHYSICS_STEP)
         on_ground = self.is_on_ground
 
         # if moved:
@@ -428,36 +2018,261 @@ class PlayerController:
         #         snd.setVolume(10)             # pick a volume 0.0–1.0
         #         snd.play()
 
+        # render between the last two physics states so motion stays smooth at any frame rate
+        alpha = self.physics_time / PHYSICS_STEP
+        # the body stays in Python floats: Vec3 is float32, and its rounding can leave
+        # the box overlapping a wall it just stopped at, which the next sweep ignores
+        pos = Vec3(*(a + (b - a) * alpha for a, b in zip(self.prev_body_pos, self.body_pos)))
+        pos.z += PLAYER_EYE_HEIGHT
         cam.setPos(pos)
+        self.camera_set = cam.getPos()
 
         # FOOTSTEP TIMER
         if moved and on_ground:
-            print(f"→ footstep tick (pos={pos}, ground={on_ground}, moved={moved})")
             self.step_timer += dt
-            print("step_timer:",self.step_timer)
             if self.step_timer >= self.step_interval:
-                print("self.step_timer >= self.step_interval:",self.step_timer >= self.step_interval)
                 self.step_timer = 0.0
                 self.play_footstep()
         else:
             # reset when not moving or in air
             self.step_timer = 0.0
 
-        if pos.z < -10:
+        if self.body_pos[2] < -10:
             self.app.spawn_at_origin()
         
         return task.cont
 
+class AdaptiveRenderDistance:
+    """Moves the render distance one step at a time to hold ADAPTIVE_TARGET_FPS."""
+    def __init__(self, distance):
+        self.distance = distance
+        self.frames = deque()  # (frame time, pipeline backlog)
+        self.window_time = 0.0
+        self.retry_at = {}     # distance -> frame time it may be grown into again
+        self.reason = "initial"
+        self.changed_at = 0.0
+
+    def reset(self):
+        self.frames.clear()
+        self.window_time = 0.0
+
+    def update(self, now, dt, backlog):
+        """Record one frame; return the (possibly changed) render distance."""
+        # separate grow and shrink thresholds, a fresh window after each change and
+        # the retry delay on distances that proved too slow keep it from churning loads
+        self.frames.append((dt, backlog))
+        self.window_time += dt
+        while self.window_time - self.frames[0][0] >= ADAPTIVE_WINDOW:
+            self.window_time -= self.frames.popleft()[0]
+        if self.window_time < ADAPTIVE_WINDOW:
+            return self.distance
+        target = 1 / ADAPTIVE_TARGET_FPS
+        average = self.window_time / len(self.frames)
+        fps = 1 / average if average else math.inf
+        least_backlog = min(b for _, b in self.frames)
+        if self.distance > RENDER_DISTANCE_MIN and average > target * (1 + ADAPTIVE_SHRINK_MARGIN):
+            self.retry_at[self.distance] = now + ADAPTIVE_RETRY_DELAY
+            self._change(now, -1, f"{fps:.0f} fps, below {ADAPTIVE_TARGET_FPS} target")
+        elif (self.distance > RENDER_DISTANCE_MIN and least_backlog > ADAPTIVE_BACKLOG_LIMIT
+                and self.frames[-1][1] >= self.frames[0][1]):  # a backlog that is draining is fine
+            self._change(now, -1, f"backlog over {least_backlog} for {ADAPTIVE_WINDOW:.0f}s")
+        elif (self.distance < RENDER_DISTANCE_MAX
+                and average <= target * (1 + ADAPTIVE_GROW_MARGIN)
+                and not any(b for _, b in self.frames)
+                and self.retry_at.get(self.distance + 1, 0) <= now):
+            self._change(now, +1, f"{fps:.0f} fps, pipeline idle")
+        return self.distance
+
+    def _change(self, now, step, reason):
+        self.distance += step
+        self.reason = f"{'grew' if step > 0 else 'shrank'} to {self.distance}: {reason}"
+        self.changed_at = now
+        log.info("Render distance %s", self.reason)
+        self.reset()
+
+class FrameScheduler:
+    """Spends a per-frame time budget on queued chunk work, most urgent unit first."""
+    def __init__(self, target_ms=FRAME_TARGET_MS, budget_ms=FRAME_WORK_BUDGET_MS,
+                 min_ms=FRAME_WORK_MIN_MS):
+        self.target_ms = target_ms
+        self.max_ms = budget_ms
+        self.min_ms = min_ms
+        self.clock = ClockObject.getGlobalClock()
+        self.sources = []    # (name, peek, run)
+        self.spent_ms = 0.0  # work done last frame
+        self.budget_ms = budget_ms
+        self.counts = {}     # units run per source last frame
+        self.unit_ms = 0.0   # running average cost of one unit
+
+    def add_source(self, name, peek, run):
+        # peek() gives the priority of the most urgent unit (lower runs first) or None when
+        # idle; run() does that unit
+        self.sources.append((name, peek, run))
+
+    def update(self, task):
+        # what the last frame left of the target; one unit always runs so slow machines progress
+        other_ms = self.clock.getDt() * 1000 - self.spent_ms
+        budget_ms = min(self.max_ms, max(self.min_ms, self.target_ms - other_ms))
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000
+        counts = {name: 0 for name, _, _ in self.sources}
+        while True:
+            best = None
+            for name, peek, run in self.sources:
+                priority = peek()
+                if priority is not None and (best is None or priority < best[0]):
+                    best = (priority, name, run)
+            if best is None:
+                break
+            unit_start = time.perf_counter()
+            best[2]()
+            counts[best[1]] += 1
+            now = time.perf_counter()
+            self.unit_ms += ((now - unit_start) * 1000 - self.unit_ms) * 0.1
+            if now + self.unit_ms / 1000 >= deadline:
+                break  # the next unit would likely overrun the budget
+        self.spent_ms = (time.perf_counter() - start) * 1000
+        self.budget_ms = budget_ms
+        self.counts = counts
+        return task.cont
+
+    def stats(self):
+        """Return (ms spent last frame, its budget, {source: units run})."""
+        return self.spent_ms, self.budget_ms, self.counts
+
+class ChunkWorkQueue:
+    """Chunk keys (with an optional payload) waiting for one kind of work, most urgent first."""
+    def __init__(self, priority):
+        self.priority = priority  # key -> sortable priority, lower runs first
+        self.items = {}           # key -> payload
+        self.heap = []            # (priority, key); entries for removed keys are skipped lazily
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, key, payload=None):
+        if key not in self.items:
+            heapq.heappush(self.heap, (self.priority(key), key))
+        self.items[key] = payload
+
+    def discard(self, key):
+        self.items.pop(key, None)
+        if len(self.heap) > 2 * len(self.items) + 64:
+            self.reprioritize()  # too many dead entries
+
+    def reprioritize(self):
+        """Rebuild the heap; call when the priorities change (the player entered another chunk)."""
+        self.heap = [(self.priority(key), key) for key in self.items]
+        heapq.heapify(self.heap)
+
+    def peek(self):
+        """Priority of the most urgent key, or None when empty."""
+        heap = self.heap
+        while heap and heap[0][1] not in self.items:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop(self):
+        """Remove the most urgent key; return (key, payload). Call after peek()."""
+        _, key = heapq.heappop(self.heap)
+        return key, self.items.pop(key)
+
+class ColumnHeights:
+    """Top solid block per world (x, y), kept per chunk column from its loaded sections."""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.columns = {}  # (cx, cy) -> int16 (CHUNK_SIZE, CHUNK_SIZE) world z, -1 = nothing solid
+
+    def section_changed(self, key):
+        """Rebuild the map of the column holding section `key`."""
+        cx, cy, _ = key
+        top = None
+        for cz in range(COLUMN_SECTIONS):
+            chunk = self.chunks.get((cx, cy, cz))
+            if chunk is None:
+                continue
+            if top is None:
+                top = np.full((CHUNK_SIZE, CHUNK_SIZE), -1, dtype=np.int16)
+            blocks = chunk.blocks
+            if blocks.uniform is not None:
+                if blocks.uniform != AIR:
+                    top[:] = cz * CHUNK_SIZE + CHUNK_SIZE - 1  # above every lower section
+                continue
+            solid = blocks.array != AIR
+            highest = CHUNK_SIZE - 1 - np.argmax(solid[:, :, ::-1], axis=2)
+            np.maximum(top, np.where(solid.any(axis=2), cz * CHUNK_SIZE + highest, -1), out=top)
+        if top is None:
+            self.columns.pop((cx, cy), None)
+        else:
+            self.columns[(cx, cy)] = top
+
+    def cell_changed(self, pos):
+        """Re-find the top of one (x, y) after the block at pos was mined or placed."""
+        cx, lx = divmod(int(pos[0]), CHUNK_SIZE)
+        cy, ly = divmod(int(pos[1]), CHUNK_SIZE)
+        top = self.columns.get((cx, cy))
+        if top is None:
+            return
+        top[lx, ly] = -1
+        for cz in reversed(range(COLUMN_SECTIONS)):
+            chunk = self.chunks.get((cx, cy, cz))
+            if chunk is None:
+                continue
+            solid = np.flatnonzero(chunk.blocks.array[lx, ly, :])
+            if len(solid):
+                top[lx, ly] = cz * CHUNK_SIZE + solid[-1]
+                break
+
+    def top_solid(self, x, y):
+        """World z of the highest solid block at (x, y), or None if nothing loaded is solid there."""
+        cx, lx = divmod(int(math.floor(x)), CHUNK_SIZE)
+        cy, ly = divmod(int(math.floor(y)), CHUNK_SIZE)
+        top = self.columns.get((cx, cy))
+        if top is None or top[lx, ly] < 0:
+            return None
+        return int(top[lx, ly])
+
 class WorldManager:
     def __init__(self, app):
         self.app = app
         self.chunk_size = CHUNK_SIZE
-        self.chunk_load_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        self.chunk_generator = ColumnGenerator()
+        self.mesh_executor = concurrent.futures.ThreadPoolExecutor(max_workers=MESH_WORKERS)
+        self.meshes_ready = Queue()  # (key, seq, version, result) from mesh workers
+        self.stale_meshes = 0        # async results dropped because the chunk changed
         self.chunks_to_finalize = Queue()
-        self.dirty_chunks = set()
+        # (cx, cy, cz) -> section drained from chunks_to_finalize
+        self.finalize_pending = ChunkWorkQueue(functools.partial(self.work_priority, kind=2))
+        self.dirty_chunks = ChunkWorkQueue(functools.partial(self.work_priority, kind=0))
+        # finalized sections whose first mesh is not requested yet
+        self.unmeshed_chunks = ChunkWorkQueue(functools.partial(self.work_priority, kind=1))
+        self.work_scheduler = FrameScheduler()
+        self.work_scheduler.add_source("finalize", self.next_finalize_priority, self.finalize_next)
+        self.work_scheduler.add_source("first mesh", self.next_unmeshed_priority, self.first_mesh_next)
+        self.work_scheduler.add_source("remesh", self.next_dirty_priority, self.remesh_next)
         self.chunks = {}  # keys: (cx, cy, cz)
-        self.world_blocks = {}  # keys: (wx, wy, wz)
+        self.world_blocks = WorldBlocks(self.chunks)  # (wx, wy, wz) lookups via chunks
+        self.lod_columns = {}      # (cx, cy) -> LodColumn, None while its mesh is being built
+        self.lods_ready = Queue()  # ((cx, cy), future) from mesh workers
+        self.region_batcher = RegionBatcher(self.app, self.chunks, self.lod_columns)
         self.last_player_chunk = None
+        self.last_render_distance = None
+        self.wanted_chunks = set()  # (cx, cy, cz) sections to hold at full detail
+        self.wanted_lods = set()    # (cx, cy) columns to draw as LOD
+        self.to_load = set()        # wanted keys not requested yet
+        self.to_evict = set()       # unwanted chunks still loaded
+        self.lods_to_drop = set()   # LOD columns waiting for their full-detail replacement
+        self.load_scheduler = ChunkLoadScheduler(self.chunk_generator)
+        self.chunk_cache = ChunkCache()
+        self.column_heights = ColumnHeights(self.chunks)
+        self.last_heading = None
+        self.adaptive_distance = AdaptiveRenderDistance(self.app.player_controller.render_distance)
         # build the set of all (cx,cy,cz=0) around origin we want before spawning
         rd = self.app.player_controller.render_distance
         keys = [
@@ -472,12 +2287,13 @@ class WorldManager:
         self.initial_terrain_ready = False
         for key in self.initial_queue:
             cx,cy,cz = key
-            fut = self.chunk_load_executor.submit(Chunk.generate_blocks_data, cx,cy,cz)
-            fut.add_done_callback(lambda f, k=key: self._on_initial_chunk(k, f.result()))
+            self.load_scheduler.request((cx, cy), functools.partial(self._on_initial_chunk, key))
             self.chunks[key] = None
         self.app.taskMgr.add(self.manage_chunks, "manageChunks")
-        self.app.taskMgr.add(self.finalize_chunks, "finalizeChunks")
-        self.app.taskMgr.add(self.process_dirty, "processDirty")
+        self.app.taskMgr.add(self.work_scheduler.update, "chunkWork")
+        self.app.taskMgr.add(self.apply_meshes, "applyMeshes")
+        self.app.taskMgr.add(self.apply_lods, "applyLods")
+        self.app.taskMgr.add(self.region_batcher.update, "batchRegions")
 
     def get_player_chunk_coords(self):
         cam = self.app.camera.getPos()
@@ -486,10 +2302,17 @@ class WorldManager:
         chunk_z = int(math.floor(cam.z / self.chunk_size))
         return (chunk_x, chunk_y, chunk_z)
     
-    def _on_initial_chunk(self, key, block_data):
+    def _enqueue_column(self, cx, cy, column):
+        # every section goes to finalize; it only keeps the ones still wanted.
+        # A None column (failed or cancelled job) tells finalize to drop the
+        # placeholders so manage_chunks retries it.
+        for cz in range(COLUMN_SECTIONS):
+            self.chunks_to_finalize.put((cx, cy, cz, None if column is None else column[cz]))
+
+    def _on_initial_chunk(self, key, column):
         cx, cy, cz = key
         # enqueue for finalization
-        self.chunks_to_finalize.put((cx, cy, cz, block_data))
+        self._enqueue_column(cx, cy, column)
         # remove from pending
         # self.initial_chunks_pending.remove(key)
         self.initial_done += 1
@@ -505,38 +2328,173 @@ class WorldManager:
 
     def manage_chunks(self, task):
         player_chunk = self.get_player_chunk_coords()
-        max_cz = (WORLD_HEIGHT // CHUNK_SIZE) - 1
-        min_cz = 0  # or set lower if you want caves below ground
-        player_cx, player_cy, player_cz = player_chunk
-        chunks_to_keep = set()
+        rd = self.effective_render_distance()
+        heading = self.app.camera.getH()
+        moved = player_chunk != self.last_player_chunk or rd != self.last_render_distance
+        if moved:
+            # the wanted sets only change when the player crosses a chunk boundary
+            self._update_wanted(player_chunk, rd)
+            self.last_player_chunk = player_chunk
+            self.last_render_distance = rd
+            for queue in (self.finalize_pending, self.unmeshed_chunks, self.dirty_chunks):
+                queue.reprioritize()
+        turned = (self.last_heading is None or
+                  abs((heading - self.last_heading + 180) % 360 - 180) > LOAD_REPRIORITIZE_ANGLE)
+        if moved or turned:
+            self.last_heading = heading
+            rad = math.radians(heading)
+            self.load_scheduler.reprioritize(player_chunk[:2], (-math.sin(rad), math.cos(rad)))
+        # everything below is a no-op while the player stands still and nothing is pending
+        if self.to_load:
+            self._load_wanted(player_chunk)
+        if self.to_evict:
+            self._evict_unwanted(player_chunk)
+        if self.lods_to_drop:
+            self._drop_replaced_lods()
+        self.load_scheduler.pump()
+        return task.cont
 
-        rd = self.app.player_controller.render_distance
+    def effective_render_distance(self):
+        """The player's render distance, or the adaptive one when ADAPTIVE_RENDER_DISTANCE is on."""
+        if not ADAPTIVE_RENDER_DISTANCE:
+            return self.app.player_controller.render_distance
+        if self.app.paused or not self.app.spawn_done:
+            self.adaptive_distance.reset()  # loading and pause frames say nothing about play
+            return self.adaptive_distance.distance
+        clock = self.app.globalClock
+        return self.adaptive_distance.update(clock.getFrameTime(), clock.getDt(),
+                                             self.pipeline_backlog())
+
+    def pipeline_backlog(self):
+        """Units of chunk work queued anywhere between the load request and the drawn mesh."""
+        queued, running, _, _ = self.load_scheduler.stats()
+        return (len(self.to_load) + queued + running + self.chunks_to_finalize.qsize()
+                + len(self.finalize_pending) + len(self.dirty_chunks)
+                + len(self.unmeshed_chunks)
+                + sum(1 for lod in self.lod_columns.values() if lod is None))
+
+    @staticmethod
+    def _chunk_distance(key, player_chunk):
+        return max(abs(key[0] - player_chunk[0]), abs(key[1] - player_chunk[1]))
+
+    def _update_wanted(self, player_chunk, rd):
+        """Recompute the full-detail and LOD load sets and queue only the differences."""
+        player_cx, player_cy, player_cz = player_chunk
+        min_cz = max(player_cz - rd, 0)  # or set lower if you want caves below ground
+        max_cz = min(player_cz + rd, COLUMN_SECTIONS - 1)
+        wanted_chunks = set()
+        wanted_lods = set()
         for dx in range(-rd, rd+1):
             for dy in range(-rd, rd+1):
-                for dz in range(-rd, rd+1):
-                    cx = player_cx + dx
-                    cy = player_cy + dy
-                    cz = player_cz + dz
-                    if cz < min_cz or cz > max_cz:
-                        continue  # Don't generate below allowed range
-                    key = (cx, cy, cz)
-                    chunks_to_keep.add(key)
-                    if key not in self.chunks:
-                        future = self.chunk_load_executor.submit(
-                            Chunk.generate_blocks_data, cx, cy, cz
-                        )
-                        # Register a callback that runs when the result is ready
-                        callback = functools.partial(self._on_chunk_loaded, cx, cy, cz)
-                        future.add_done_callback(callback)
-                        self.chunks[key] = None
-
-        for key, chunk in list(self.chunks.items()):
-            if key not in chunks_to_keep and chunk is not None:
-                chunk.destroy()
-                del self.chunks[key]
-
-        self.last_player_chunk = player_chunk
-        return task.cont
+                cx, cy = player_cx + dx, player_cy + dy
+                if max(abs(dx), abs(dy)) > LOD_DISTANCE:
+                    wanted_lods.add((cx, cy))
+                else:
+                    wanted_chunks.update((cx, cy, cz) for cz in range(min_cz, max_cz + 1))
+
+        self.to_load |= (wanted_chunks - self.wanted_chunks) | (wanted_lods - self.wanted_lods)
+        self.to_evict |= self.wanted_chunks - wanted_chunks
+        self.to_load &= wanted_chunks | wanted_lods
+        self.to_evict -= wanted_chunks
+        full_columns = {key[:2] for key in wanted_chunks}
+        for col in {key[:2] for key in self.wanted_chunks} - full_columns:
+            self.load_scheduler.cancel(col)
+        for col in self.wanted_lods - wanted_lods:
+            if col in full_columns:
+                self.lods_to_drop.add(col)  # once its full-detail sections are drawn
+            else:
+                self._drop_lod(col)
+        self.lods_to_drop -= wanted_lods
+        self.wanted_chunks = wanted_chunks
+        self.wanted_lods = wanted_lods
+
+    def _load_wanted(self, player_chunk):
+        # nearest first, so the ground under the player is requested before the horizon
+        for key in sorted(self.to_load, key=lambda k: self._chunk_distance(k, player_chunk)):
+            if len(key) == 2:
+                if key not in self.lod_columns:
+                    self.lod_columns[key] = None
+                    future = self.mesh_executor.submit(lod_column_buffers, *key)
+                    future.add_done_callback(lambda f, col=key: self.lods_ready.put((col, f)))
+                continue
+            if key in self.chunks:
+                continue  # still loaded, or its column job is in flight
+            cached = self.chunk_cache.take(key)
+            if cached is not None:
+                self._restore_chunk(key, *cached)
+                continue
+            cx, cy, _ = key
+            self.chunks[key] = None
+            if self.load_scheduler.has((cx, cy)):
+                continue  # one job fills every section of the column
+            # Register a callback that runs when the result is ready
+            callback = functools.partial(self._on_column_loaded, cx, cy)
+            self.load_scheduler.request((cx, cy), callback)
+        self.to_load.clear()
+
+    def _evict_unwanted(self, player_chunk):
+        # farthest first
+        for key in sorted(self.to_evict, key=lambda k: -self._chunk_distance(k, player_chunk)):
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                # nothing loaded, or a placeholder whose section is no longer needed
+                self.chunks.pop(key, None)
+                self.to_evict.discard(key)
+                continue
+            if self.lod_columns.get(key[:2], False) is None:
+                continue  # keep drawing it until its LOD replacement is built
+            # a chunk still waiting for a re-mesh caches its blocks only
+            mesh = None if key in self.dirty_chunks else chunk.detach_mesh()
+            self.chunk_cache.put(key, chunk.blocks.copy(), mesh)
+            chunk.destroy()
+            del self.chunks[key]
+            self.column_heights.section_changed(key)
+            self.region_batcher.chunk_removed(key)
+            self.app.saved_blocks.release(key)
+            self.to_evict.discard(key)
+
+    def _restore_chunk(self, key, blocks, mesh):
+        """Bring back an evicted chunk from the cache instead of regenerating it."""
+        # the cached blocks already include the saved edits
+        chunk = Chunk.from_block_data(
+            self.app, *key, self.app.tex_dict, blocks, self.world_blocks,
+            self.region_batcher.parent_for(key)
+        )
+        self.chunks[key] = chunk
+        self.column_heights.section_changed(key)
+        if mesh is not None and mesh[-1] == (MESH_MODE, TEXTURE_ATLAS):
+            chunk.attach_mesh(mesh)
+            self.region_batcher.chunk_changed(key)
+            if chunk.meshed_without - chunk.missing_neighbours():
+                self.dirty_chunks.add(key)  # neighbours came back that the cached mesh lacked
+        else:
+            if mesh is not None:
+                mesh[0].removeNode()  # built for another mesh mode
+            self.request_mesh(chunk)
+        self._neighbour_loaded(key)
+
+    def _neighbour_loaded(self, key):
+        """Re-mesh loaded neighbours whose mesh was built with this section missing."""
+        for (dx, dy, dz), _, _ in FACES:
+            neighbour_key = (key[0] + dx, key[1] + dy, key[2] + dz)
+            neighbour = self.chunks.get(neighbour_key)
+            if neighbour is not None and (-dx, -dy, -dz) in neighbour.meshed_without:
+                self.dirty_chunks.add(neighbour_key)
+
+    def _drop_replaced_lods(self):
+        for col in list(self.lods_to_drop):
+            sections = [self.chunks.get(col + (cz,)) for cz in range(COLUMN_SECTIONS)
+                        if col + (cz,) in self.wanted_chunks]
+            if all(c is not None and c.meshed for c in sections):
+                self._drop_lod(col)
+                self.lods_to_drop.discard(col)
+            # otherwise keep the LOD until the full detail is drawn, so no hole opens
+
+    def _drop_lod(self, col):
+        lod = self.lod_columns.pop(col, None)
+        if lod is not None:  # a pending build is simply ignored when it comes back
+            lod.destroy()
+            self.region_batcher.chunk_removed(col)
 
     # def finalize_chunks(self, task):
     #     count = 0
@@ -578,59 +2536,184 @@ class WorldManager:
     #         count += 1
     #     return task.cont
 
-    def finalize_chunks(self, task):
-        count = 0
-        while count < MAX_FINALIZE_PER_FRAME and not self.chunks_to_finalize.empty():
-            cx, cy, cz, block_data = self.chunks_to_finalize.get()
+    def work_priority(self, key, kind):
+        """Chunk work priority: nearest first, then kind (0 re-mesh, 1 first mesh, 2 finalize)."""
+        player_chunk = self.last_player_chunk or self.get_player_chunk_coords()
+        return (max(abs(k - p) for k, p in zip(key, player_chunk)), kind)
+
+    def next_finalize_priority(self):
+        while not self.chunks_to_finalize.empty():
+            cx, cy, cz, section = self.chunks_to_finalize.get()
+            self.finalize_pending.add((cx, cy, cz), section)
+        return self.finalize_pending.peek()
+
+    def finalize_next(self):
+        key, section = self.finalize_pending.pop()
+        if self.chunks.get(key, False) is not None:
+            return  # section already loaded or never requested
+        if key not in self.wanted_chunks or section is None:
+            del self.chunks[key]
+            if key in self.wanted_chunks:
+                self.to_load.add(key)  # generation failed; manage_chunks retries it
+            return
+        block_data = ChunkStorage.from_array(section)
 
-            # 1) Seed the global world map with this chunk’s base data
-            for (lx, ly, lz), btype in block_data.items():
-                wx, wy, wz = cx*CHUNK_SIZE + lx, cy*CHUNK_SIZE + ly, cz*CHUNK_SIZE + lz
-                self.world_blocks[(wx, wy, wz)] = btype
+        # 1) Build the chunk from the base data; registering it in
+        #    self.chunks is all it takes to make it visible to world_blocks
+        chunk = Chunk.from_block_data(
+            self.app, *key, self.app.tex_dict, block_data, self.world_blocks,
+            self.region_batcher.parent_for(key)
+        )
+        self.chunks[key] = chunk
+        self.unmeshed_chunks.add(key)
+
+        # 2) Re-apply the saved edits that fall inside this chunk
+        self.app.saved_blocks.apply_to(chunk)
+        self.column_heights.section_changed(key)
+        self._neighbour_loaded(key)
+
+    def next_unmeshed_priority(self):
+        return self.unmeshed_chunks.peek()
+
+    def first_mesh_next(self):
+        key, _ = self.unmeshed_chunks.pop()
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            # neighbours that arrive later re-mesh it to cull the faces along their border;
+            # apply_meshes counts it as done once it is swapped in
+            self.request_mesh(chunk)
+
+    def next_dirty_priority(self):
+        if self.app.paused:
+            return None
+        return self.dirty_chunks.peek()
+
+    def remesh_next(self):
+        key, _ = self.dirty_chunks.pop()
+        log.debug("[dirty] → re-meshing chunk %s", key)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.request_mesh(chunk)
+    
+    def remesh_now(self, keys):
+        """Re-mesh the given loaded chunks on the main thread, visible this frame."""
+        # an 8³ chunk meshes in well under a millisecond, quicker than a worker round trip
+        for key in keys:
+            chunk = self.chunks.get(key)
+            if chunk is None or not chunk.meshed:
+                continue  # its first mesh is in flight; apply_meshes re-requests it when stale
+            chunk.mesh_seq += 1  # any in-flight async mesh is now out of date
+            chunk.build_mesh()
+            self.dirty_chunks.discard(key)
+            self.region_batcher.chunk_changed(key)
+
+    def request_mesh(self, chunk):
+        """Snapshot a chunk and mesh it on a worker; apply_meshes swaps the result in."""
+        chunk.mesh_seq += 1
+        key = (chunk.chunk_x, chunk.chunk_y, chunk.chunk_z)
+        seq = chunk.mesh_seq
+        version, args = chunk.mesh_snapshot()
+        if chunk.mesh_is_empty(args[1]):
+            # nothing to draw: skip the mesh workers, apply_meshes swaps in the empty mesh
+            future = concurrent.futures.Future()
+            future.set_result(EMPTY_MESH)
+            self.meshes_ready.put((key, seq, version, future))
+            return
+        future = self.mesh_executor.submit(mesh_buffers, *args)
+        future.add_done_callback(
+            lambda f: self.meshes_ready.put((key, seq, version, f)))
 
-            # 2) Build the chunk from that base data
-            chunk = Chunk.from_block_data(
-                self.app, cx, cy, cz, self.app.tex_dict, block_data, self.world_blocks
-            )
-            self.chunks[(cx, cy, cz)] = chunk
-            self.app.building_chunks.append(chunk)
-
-            # 3) Re-apply *every* saved edit into both global + chunk:
-            for (wx, wy, wz), bt in self.app.saved_blocks.items():
-                sx, sy, sz = wx - cx*CHUNK_SIZE, wy - cy*CHUNK_SIZE, wz - cz*CHUNK_SIZE
-                if 0 <= sx < CHUNK_SIZE and 0 <= sy < CHUNK_SIZE and 0 <= sz < CHUNK_SIZE:
-                    if bt is None:
-                        # mined out — ensure both maps are empty
-                        self.world_blocks.pop((wx, wy, wz), None)
-                        chunk.blocks.pop((sx, sy, sz), None)
-                    else:
-                        # placed or replaced — write back in
-                        self.world_blocks[(wx, wy, wz)] = bt
-                        chunk.blocks[(sx, sy, sz)] = bt
+    def apply_meshes(self, task):
+        while not self.meshes_ready.empty():
+            key, seq, version, future = self.meshes_ready.get()
+            chunk = self.chunks.get(key)
+            if chunk is None or chunk.mesh_seq != seq:
+                # unloaded, or superseded by a newer request
+                self.stale_meshes += 1
+                continue
+            if chunk.blocks.version != version:
+                # edited while meshing and nothing newer is coming: mesh it again
+                self.stale_meshes += 1
+                self.request_mesh(chunk)
+                continue
+            if future.exception() is not None:
+                log.error("Meshing chunk %s failed: %r", key, future.exception())
+                continue
+            first_mesh = not chunk.meshed
+            chunk.apply_mesh(*future.result())
+            chunk.mesh_version = version
+            self.region_batcher.chunk_changed(key)
+            if first_mesh:
+                self.app.on_chunk_meshed(chunk)
+        return task.cont
 
-            count += 1
+    def apply_lods(self, task):
+        while not self.lods_ready.empty():
+            col, future = self.lods_ready.get()
+            if col not in self.lod_columns or self.lod_columns[col] is not None:
+                continue  # dropped before its mesh came back
+            if future.exception() is not None:
+                log.error("LOD mesh for column %s failed: %r", col, future.exception())
+                del self.lod_columns[col]
+                continue
+            self.lod_columns[col] = LodColumn(self.app, col[0], col[1], *future.result(),
+                                              self.region_batcher.parent_for(col))
         return task.cont
 
-    def process_dirty(self, task):
-        if self.app.paused:
-            return task.cont
-        # rebuild at most N dirty chunks per frame (to cap cost)
-        count = 0
-        # debug: show what's pending
-        # log.debug("Dirty before rebuild: %s", self.dirty_chunks)
-        while count < MAX_DIRTY_PER_FRAME and self.dirty_chunks:
-            key = self.dirty_chunks.pop()
-            log.debug("[dirty] → re-meshing chunk %s", key)
-            chunk = self.chunks.get(key)
+    def block_memory_stats(self):
+        """Return (loaded chunk count, bytes held by their block storage)."""
+        loaded = [c for c in self.chunks.values() if c is not None]
+        return len(loaded), sum(c.blocks.memory_usage() for c in loaded)
+
+    def storage_stats(self):
+        """Return (uniform air, uniform solid, packed, dense) loaded chunk counts."""
+        air = solid = packed = dense = 0
+        for chunk in self.chunks.values():
+            if chunk is None:
+                continue
+            if chunk.blocks.uniform == AIR:
+                air += 1
+            elif chunk.blocks.uniform is not None:
+                solid += 1
+            elif chunk.blocks.palette is not None:
+                packed += 1
+            else:
+                dense += 1
+        return air, solid, packed, dense
+
+    def block_memory_comparison(self):
+        """Return what the loaded chunks' blocks would take as (dense arrays, the old dicts), in bytes."""
+        dense_chunk = ChunkStorage(np.zeros((CHUNK_SIZE,) * 3, dtype=np.uint8)).memory_usage()
+        dense = dict_bytes = 0
+        for chunk in self.chunks.values():
             if chunk is not None:
-                chunk.build_mesh(force_cull=True)
-            count += 1
-        # log.debug("Dirty after rebuild: %s", self.dirty_chunks)
-        return task.cont
-    
-    def _on_chunk_loaded(self, cx, cy, cz, future):
-        result = future.result()
-        self.chunks_to_finalize.put((cx, cy, cz, result))
+                dense += dense_chunk
+                dict_bytes += dict_storage_bytes(len(chunk.blocks))
+        return dense, dict_bytes
+
+    def mesh_stats(self):
+        """Return (quads emitted, exposed faces = what a one-quad-per-face mesher would emit)."""
+        quads = faces = 0
+        for chunk in self.chunks.values():
+            if chunk is not None:
+                quads += chunk.quad_count
+                faces += chunk.face_count
+        return quads, faces
+
+    def draw_call_count(self):
+        """Geoms the loaded chunk meshes submit per frame (one draw call each)."""
+        if REGION_BATCHING:
+            return self.region_batcher.stats()[2]
+        members = list(self.chunks.values()) + list(self.lod_columns.values())
+        return sum(m.geom_count for m in members if m is not None)
+
+    def remesh_all(self):
+        for key, chunk in self.chunks.items():
+            if chunk is not None:
+                self.dirty_chunks.add(key)
+
+    def _on_column_loaded(self, cx, cy, column):
+        self._enqueue_column(cx, cy, column)
 
 class UIManager:
     def __init__(self, app):
@@ -739,11 +2822,48 @@ class UIManager:
             pos = self.app.camera.getPos()
             fps = self.app.globalClock.getAverageFrameRate()
             chunk = self.app.world_manager.get_player_chunk_coords()
+            loaded, block_bytes = self.app.world_manager.block_memory_stats()
+            uniform_air, uniform_solid, packed, dense = self.app.world_manager.storage_stats()
+            as_dense, as_dict = self.app.world_manager.block_memory_comparison()
+            quads, faces = self.app.world_manager.mesh_stats()
+            batched, regions, _ = self.app.world_manager.region_batcher.stats()
+            queued, running, cancelled, wasted = self.app.world_manager.load_scheduler.stats()
+            cached, cached_bytes, spilled, hits, disk_hits, misses = \
+                self.app.world_manager.chunk_cache.stats()
+            lookups = hits + disk_hits + misses
+            work_ms, budget_ms, work_counts = self.app.world_manager.work_scheduler.stats()
+            lod_quads = sum(c.quad_count for c in self.app.world_manager.lod_columns.values() if c)
+            per_chunk = block_bytes / loaded if loaded else 0
+            adaptive = self.app.world_manager.adaptive_distance
+            if ADAPTIVE_RENDER_DISTANCE:
+                distance_line = (f"Render distance: {self.app.world_manager.last_render_distance}"
+                                 f" (adaptive, {ADAPTIVE_TARGET_FPS} fps target) | {adaptive.reason}")
+            else:
+                distance_line = f"Render distance: {self.app.player_controller.render_distance} (fixed)"
             self.debug_text.setText(
                 f"FPS: {fps:.1f}\n"
+                f"{distance_line}\n"
                 f"Pos: ({pos.x:.2f}, {pos.y:.2f}, {pos.z:.2f})\n"
                 f"Chunk: {chunk}\n"
-                f"Block: {self.app.block_interaction.selected_block_type}"
+                f"Block: {self.app.block_interaction.selected_block_type}\n"
+                f"Block mem: {loaded} chunks, {block_bytes / 1024:.1f} KiB ({per_chunk:.0f} B/chunk)"
+                f" | uniform {uniform_air} air + {uniform_solid} solid, {packed} packed, {dense} dense\n"
+                f"Block mem if dense: {as_dense / 1024:.1f} KiB, as dicts: {as_dict / 1024:.1f} KiB\n"
+                f"Mesh ({'naive, atlas' if TEXTURE_ATLAS else MESH_MODE}): {quads * 4} verts, {quads * 2} tris"
+                f" | naive: {faces * 4} verts, {faces * 2} tris\n"
+                f"Stale meshes dropped: {self.app.world_manager.stale_meshes}\n"
+                f"Chunk draw calls: {self.app.world_manager.draw_call_count()}"
+                f" (atlas {'on' if TEXTURE_ATLAS else 'off'})\n"
+                f"Regions: {batched}/{regions} batched\n"
+                f"LOD columns: {sum(1 for c in self.app.world_manager.lod_columns.values() if c)}"
+                f" beyond {LOD_DISTANCE} chunks, {lod_quads * 2} tris\n"
+                f"Load queue: {queued} queued, {running} generating,"
+                f" {cancelled} cancelled, {wasted} wasted\n"
+                f"Chunk cache: {cached} in memory ({cached_bytes / 2**20:.1f} MiB), {spilled} on disk,"
+                f" hits {hits}+{disk_hits} disk, misses {misses}"
+                f" ({(hits + disk_hits) / lookups if lookups else 0:.0%} hit rate)\n"
+                f"Chunk work: {work_ms:.1f}/{budget_ms:.1f} ms ("
+                + ", ".join(f"{name} {n}" for name, n in work_counts.items()) + ")"
             )
         return task.cont
 
@@ -959,6 +3079,7 @@ class BlockInteraction:
         self.ghost_block = self.make_ghost_block()
         self.ghost_block.reparentTo(self.ghost_np)
         self.ghost_np.hide()
+        self.ray_cache = None  # (camera/world key, cast_ray result)
         self.app.taskMgr.add(self.update_ghost, "ghostBlockTask")
 
     def make_ghost_block(self):
@@ -994,38 +3115,41 @@ class BlockInteraction:
         np.setDepthOffset(1)
         return np
 
-    def cast_ray(self, max_dist=6.0, step=0.1):
+    def cast_ray(self, max_dist=6.0):
+        """Return (hit block, outward face normal, empty cell in front of it, distance), or all None."""
+        world_blocks = self.app.world_manager.world_blocks
         cam_pos = self.app.camera.getPos()
         dir_vec = self.app.camera.getQuat().getForward()
-        pos = Point3(cam_pos)
-        last_empty = None
-
-        for _ in range(int(max_dist/step)):
-            block = (
-                int(math.floor(pos.x)),
-                int(math.floor(pos.y)),
-                int(math.floor(pos.z))
-            )
-            if block in self.app.world_manager.world_blocks:
-                if last_empty is not None:
-                    face_normal = (
-                        block[0] - last_empty[0],
-                        block[1] - last_empty[1],
-                        block[2] - last_empty[2]
-                    )
-                else:
-                    face_normal = (0,0,0)
-                return block, face_normal, last_empty
-            else:
-                last_empty = block
-            pos += dir_vec * step
-
-        return None, None, None
+        end = cam_pos + dir_vec * max_dist
+        chunk_range = [range(int(math.floor(min(a, b) / CHUNK_SIZE)),
+                             int(math.floor(max(a, b) / CHUNK_SIZE)) + 1)
+                       for a, b in zip(cam_pos, end)]
+        chunk_keys = [(cx, cy, cz) for cx in chunk_range[0]
+                      for cy in chunk_range[1] for cz in chunk_range[2]]
+        key = (tuple(cam_pos), tuple(dir_vec), max_dist, world_blocks.versions(chunk_keys))
+        # reused while the camera and the chunks the ray can reach are unchanged
+        if self.ray_cache is not None and self.ray_cache[0] == key:
+            return self.ray_cache[1]
+
+        result = None, None, None, None
+        hit = raycast_voxels(world_blocks, cam_pos, dir_vec, max_dist)
+        if hit is not None:
+            block, normal, distance = hit
+            place_pos = None
+            if normal != (0, 0, 0):
+                place_pos = tuple(b + n for b, n in zip(block, normal))
+            result = block, normal, place_pos, distance
+        self.ray_cache = (key, result)
+        return result
+
+    def cast_rays(self, origins, directions, max_dist=6.0):
+        """Batched cast for many rays; see raycast_voxels_many."""
+        return raycast_voxels_many(self.app.world_manager.world_blocks, origins, directions, max_dist)
 
     def update_ghost(self, task):
         if self.app.paused:
             return task.cont
-        hit_block, face_normal, place_pos = self.cast_ray()
+        hit_block, face_normal, place_pos, _ = self.cast_ray()
         if place_pos is not None:
             x,y,z = place_pos
             if 0 <= z < WORLD_HEIGHT and place_pos not in self.app.world_manager.world_blocks:
@@ -1045,15 +3169,16 @@ class BlockInteraction:
         lz = int(world_pos[2] % self.app.world_manager.chunk_size)
         return (cx, cy, cz), (lx, ly, lz)
 
-    def get_chunks_to_update(self, world_pos, normal):
+    def get_chunks_to_update(self, world_pos):
+        """The chunk owning world_pos plus every neighbour whose mesh borders that cell."""
         chunk_key, local = self.get_chunk_and_local(world_pos)
         update = {chunk_key}
-        for i, d in enumerate(['x','y','z']):
-            if local[i] == 0 and normal[i] == -1:
+        for i in range(3):
+            if local[i] == 0:
                 k = list(chunk_key)
                 k[i] -= 1
                 update.add(tuple(k))
-            elif local[i] == self.app.world_manager.chunk_size - 1 and normal[i] == 1:
+            elif local[i] == self.app.world_manager.chunk_size - 1:
                 k = list(chunk_key)
                 k[i] += 1
                 update.add(tuple(k))
@@ -1065,7 +3190,7 @@ class BlockInteraction:
             log.warning("Can't mine: game paused")
             return
 
-        block_coord, normal, _ = self.cast_ray()
+        block_coord, normal, _, _ = self.cast_ray()
         if not block_coord:
             return
 
@@ -1074,16 +3199,12 @@ class BlockInteraction:
         if block_type is None:
             return
 
-        # 1) Remove the block from the world map
+        # 1) Remove the block from the owning chunk’s storage
         del wm.world_blocks[block_coord]
 
-        # 2) Remove from the chunk’s local storage
-        chunk_key, local = self.get_chunk_and_local(block_coord)
-        chunk = wm.chunks.get(chunk_key)
-        if chunk:
-            chunk.blocks.pop(local, None)
-
-        wm.dirty_chunks.add(chunk_key)
+        # 2) Re-mesh it and any neighbour chunk bordering the cell, visible this frame
+        wm.remesh_now(self.get_chunks_to_update(block_coord))
+        wm.column_heights.cell_changed(block_coord)
 
         # Then *record* that this coordinate is now empty (so it stays empty on reload)
         self.app.saved_blocks[block_coord] = None
@@ -1100,7 +3221,7 @@ class BlockInteraction:
             return
 
         # 2) Ray-cast for the empty position
-        _, normal, place_pos = self.cast_ray()
+        _, normal, place_pos, _ = self.cast_ray()
         if not place_pos:
             return
 
@@ -1108,16 +3229,15 @@ class BlockInteraction:
         if place_pos in wm.world_blocks:
             return
 
-        # 3) Add the block to the world map
-        wm.world_blocks[place_pos] = block_type
-
-        # 4) Add to the chunk’s local storage
+        # 3) Add the block to the owning chunk’s storage (only if it is loaded)
         chunk_key, local = self.get_chunk_and_local(place_pos)
-        chunk = wm.chunks.get(chunk_key)
-        if chunk:
-            chunk.blocks[local] = block_type
+        if wm.chunks.get(chunk_key) is None:
+            return
+        wm.world_blocks[place_pos] = block_type
 
-        wm.dirty_chunks.add(chunk_key)
+        # 4) Re-mesh it and any neighbour chunk bordering the cell, visible this frame
+        wm.remesh_now(self.get_chunks_to_update(place_pos))
+        wm.column_heights.cell_changed(place_pos)
 
         # And record it permanently:
         self.app.saved_blocks[place_pos] = block_type
@@ -1162,6 +3282,13 @@ class CubeCraft(ShowBase):
             tex.setMagfilter(Texture.FTNearest)
             tex.setMinfilter(Texture.FTNearest)
             self.tex_dict[k] = tex
+
+        # all block textures packed into one, for the TEXTURE_ATLAS render path
+        atlas_image, self.atlas_uvs = build_texture_atlas()
+        self.atlas_tex = Texture("block_atlas")
+        self.atlas_tex.load(atlas_image)
+        self.atlas_tex.setMagfilter(Texture.FTNearest)
+        self.atlas_tex.setMinfilter(Texture.FTNearest)
         
         self.clouds_tex = self.loader.loadTexture("assets/clouds.png")
         self.clouds_tex.setMagfilter(Texture.FTNearest)
@@ -1199,7 +3326,9 @@ class CubeCraft(ShowBase):
         self.graphicsEngine.renderFrame()
 
         # Before creating WorldManager, load any saved world:
-        self.saved_blocks = self.load_world("world.dat")
+        self.saved_blocks = self.load_world()
+        self.journal_compactor = JournalCompactor(self.saved_blocks)
+        self.journal_compactor.start()
 
         self.world_manager     = WorldManager(self)
         self.block_interaction = BlockInteraction(self)
@@ -1271,8 +3400,6 @@ class CubeCraft(ShowBase):
         # give the moon a soft bluish tint so it still pops at night:
         self.moon_np.setColorScale(0.8, 0.8, 1.0, 1)
 
-        self.building_chunks = []
-        self.taskMgr.add(self.block_interaction.update_ghost, "ghostBlockTask")
         self.taskMgr.add(self.update_daynight, "dayNightTask")
         self.clouds = Clouds(self, height=WORLD_HEIGHT*CHUNK_SIZE + 20)
         # add an update task
@@ -1283,61 +3410,31 @@ class CubeCraft(ShowBase):
         self.clouds.update(dt)
         return task.cont
 
-    def update_chunk_building(self, task):
-        # process more planes per frame if flycam
-        max_planes = MAX_FINALIZE_PER_FRAME
-        if self.player_controller.no_clip:
-            max_planes = 10   # or however many you can handle
-
-        planes = 0
-        while self.building_chunks and planes < max_planes:
-            chunk = self.building_chunks[0]
-            still_more = chunk.process_next_plane()
-            planes += 1
-
-            if not still_more:
-                # initial mesh (no culling) now that all planes exist
-                log.debug("Chunk %d,%d,%d built (unculled mesh).", chunk.chunk_x, chunk.chunk_y, chunk.chunk_z)
-                chunk.build_mesh(force_cull=False)
-
-                # now count this mesh as “done”
-                self.mesh_done += 1
-                # update combined progress
-                done = self.world_manager.initial_done + self.mesh_done
-                total = self.world_manager.initial_total * 2
-                self.ui_manager.update_loading(done, total)
-
-                # now let process_dirty handle the force_cull pass over subsequent frames
-                self.world_manager.dirty_chunks.add((chunk.chunk_x,
-                                                     chunk.chunk_y,
-                                                     chunk.chunk_z))
-                # done—drop it from the queue
-                self.building_chunks.pop(0)
+    def on_chunk_meshed(self, chunk):
+        # count a chunk's first mesh as “done”
+        self.mesh_done += 1
+        # update combined progress
+        done = self.world_manager.initial_done + self.mesh_done
+        total = self.world_manager.initial_total * 2
+        self.ui_manager.update_loading(done, total)
 
+    def update_chunk_building(self, task):
         # Only spawn once *every* mesh and cull‐remesh is fully finished:
         done  = self.world_manager.initial_done  + self.mesh_done
         total = self.world_manager.initial_total * 2
         if (not self.spawn_done
             and done >= total
-            and not self.building_chunks):
+            and not self.world_manager.unmeshed_chunks):
             # and not self.world_manager.dirty_chunks):
             log.info(">>> World load complete — unpausing now")
 
-            for pos, bt in self.saved_blocks.items():
-                # override global map
-                self.world_manager.world_blocks[pos] = bt
-                # find chunk & local coords
-                (cx, cy, cz), (lx, ly, lz) = self.block_interaction.get_chunk_and_local(pos)
-                chunk_key = (cx, cy, cz)
-                # grab or create that chunk
+            for chunk_key in self.saved_blocks.by_chunk:
                 chunk = self.world_manager.chunks.get(chunk_key)
                 if chunk is None:
-                    # no chunk there yet — make a brand new shell and schedule it to build
-                    chunk = Chunk(self, cx, cy, cz, self.tex_dict, self.world_manager.world_blocks)
-                    self.world_manager.chunks[chunk_key] = chunk
-                    self.building_chunks.append(chunk)
-                # NOW it's guaranteed to be a real Chunk
-                chunk.blocks[(lx, ly, lz)] = bt
+                    # not loaded yet; finalize applies its edits when it arrives
+                    continue
+                self.saved_blocks.apply_to(chunk)
+                self.world_manager.column_heights.section_changed(chunk_key)
                 self.world_manager.dirty_chunks.add(chunk_key)
                 # chunk = self.world_manager.chunks.get((cx, cy, cz))
                 # if chunk:
@@ -1373,6 +3470,9 @@ class CubeCraft(ShowBase):
             self.accept("escape", self.handle_escape_key)
             self.accept("f3",     self.toggle_f3_features)
             self.accept("f2",     self.player_controller.toggle_clip)
+            self.accept("f4",     self.toggle_mesh_mode)
+            self.accept("f5",     self.toggle_texture_atlas)
+            self.accept("f6",     self.toggle_adaptive_distance)
 
         return task.cont
 
@@ -1389,13 +3489,36 @@ class CubeCraft(ShowBase):
         self.toggle_wireframe()
         self.ui_manager.toggle_debug()
 
+    def toggle_texture_atlas(self):
+        global TEXTURE_ATLAS
+        TEXTURE_ATLAS = not TEXTURE_ATLAS
+        log.info("Texture atlas is now %s", "on" if TEXTURE_ATLAS else "off")
+        self.world_manager.remesh_all()
+
+    def toggle_adaptive_distance(self):
+        global ADAPTIVE_RENDER_DISTANCE
+        ADAPTIVE_RENDER_DISTANCE = not ADAPTIVE_RENDER_DISTANCE
+        log.info("Adaptive render distance is now %s", "on" if ADAPTIVE_RENDER_DISTANCE else "off")
+        adaptive = self.world_manager.adaptive_distance
+        distance = self.world_manager.last_render_distance or adaptive.distance
+        adaptive.distance = max(RENDER_DISTANCE_MIN, min(RENDER_DISTANCE_MAX, distance))
+        adaptive.reset()
+
+    def toggle_mesh_mode(self):
+        global MESH_MODE
+        MESH_MODE = "naive" if MESH_MODE == "greedy" else "greedy"
+        log.info("Mesh mode is now %s", MESH_MODE)
+        self.world_manager.remesh_all()
+
     def exit_game(self):
         print("Saving and quitting...")
         # dump the world to disk
-        self.save_world("world.dat")
+        self.save_world()
 
         # then shut down threads and exit
-        self.world_manager.chunk_load_executor.shutdown(wait=False)
+        self.world_manager.chunk_generator.shutdown()
+        self.world_manager.chunk_cache.close()
+        self.world_manager.mesh_executor.shutdown(wait=False, cancel_futures=True)
         self.userExit()
 
     def set_block_type(self, k):
@@ -1403,7 +3526,9 @@ class CubeCraft(ShowBase):
 
     def spawn_at_origin(self):
         x, y = 0, 0
-        h = get_terrain_height(x, y, SCALE, OCTAVES, PERSISTENCE, LACUNARITY)
+        h = self.world_manager.column_heights.top_solid(x, y)
+        if h is None:  # origin column not loaded (e.g. respawning from far away)
+            h = get_terrain_height(x, y, SCALE, OCTAVES, PERSISTENCE, LACUNARITY)
         spawn_z = h + PLAYER_HEIGHT + 10
         self.camera.setPos(x, y, spawn_z)
         self.player_controller.player_vel = Vec3(0, 0, 0)
@@ -1472,37 +3597,31 @@ class CubeCraft(ShowBase):
 
         return task.cont
     
-    def save_world(self, filename="world.dat"):
-        """Serialize self.saved_blocks to a compact binary file, including mined blocks."""
-        wb = self.saved_blocks
-        print(f"Saving {len(wb)} saved edits...")
-        with open(filename, "wb") as f:
-            f.write(struct.pack("<I", len(wb)))  # number of entries
-            for (x, y, z), bt in wb.items():
-                # Encode `None` (mined blocks) as 255
-                encoded_bt = 255 if bt is None else bt
-                f.write(struct.pack("<iiiB", x, y, z, encoded_bt))
-        print("World saved to", filename)
-
-    def load_world(self, filename="world.dat"):
-        """Return a dict of block edits, with None for mined blocks."""
-        if not os.path.isfile(filename):
-            return {}
-        with open(filename, "rb") as f:
-            data = f.read(4)
-            if len(data) < 4:
-                return {}
-            (count,) = struct.unpack("<I", data)
-            blocks = {}
-            record_size = struct.calcsize("<iiiB")
-            for _ in range(count):
-                chunk = f.read(record_size)
-                if len(chunk) < record_size:
-                    break
-                x, y, z, bt = struct.unpack("<iiiB", chunk)
-                blocks[(x, y, z)] = None if bt == 255 else bt
-            return blocks
+    def save_world(self):
+        """Fold the edit journal into the region files and close it."""
+        self.journal_compactor.stop()
+        written = self.saved_blocks.save()
+        self.saved_blocks.journal.close()
+        print(f"Saved edits for {written} chunks to {self.saved_blocks.store.path}")
+
+    def load_world(self, path=WORLD_DIR):
+        """Open the saved edits, converting an old world.dat once; chunks read their edits as they load."""
+        if not os.path.isdir(path) and os.path.isfile(LEGACY_WORLD_FILE):
+            convert_legacy_world(LEGACY_WORLD_FILE, path)
+        saved = SavedEdits(RegionStore(path), EditJournal(os.path.join(path, "journal.log")))
+        # edits made after the last compaction (e.g. before a crash) are only in the journal
+        replayed = saved.replay_journal()
+        if replayed:
+            log.info("Replayed %d journaled edits", replayed)
+            saved.save()
+        return saved
 
 if __name__ == "__main__":
+    if "--bench-terrain" in sys.argv:
+        benchmark_terrain()
+        sys.exit(0)
+    if "--convert-world" in sys.argv:
+        convert_legacy_world()
+        sys.exit(0)
     app = CubeCraft()
     app.run()